@@ -0,0 +1,150 @@
+"""
+Latency and fan-out throughput of the embedded broker against an external one.
+
+The leader runs in a child process. With the embedded broker it publishes
+straight into its own broker, with an external broker it publishes over
+TCP like networkmqtt.Server does. The followers are raw MQTT connections
+in this process.
+
+Without --external the "external" broker is broker.py itself in its own
+process, which only measures the cost of the extra hop and process. Point
+--external at mosquitto or the broker in use to compare against it.
+
+    python bench_broker.py                              # external = broker.py in its own process
+    python bench_broker.py --external 127.0.0.1:1883    # e.g. a local mosquitto
+    python bench_broker.py --subscribers 500 --messages 2000
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from broker import (CONNECT, PUBLISH, EmbeddedBroker, encode_publish, encode_string, encode_subscribe, packet,
+                    read_packet, decode_string, open_client)
+
+TOPIC = "$bench"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def follower(host, port, index, expected, latencies, ready, done):
+    reader, writer = await open_client(host, port, "follower-{}".format(index))
+    writer.write(encode_subscribe(TOPIC + "/#"))
+    await read_packet(reader)
+    ready.append(index)
+    received = 0
+    try:
+        while received < expected:
+            packet_type, flags, body = await read_packet(reader)
+            if packet_type != PUBLISH:
+                continue
+            topic, offset = decode_string(body, 0)
+            sent = int(body[offset:].split(b",")[0])
+            latencies.append(time.monotonic_ns() - sent)
+            received += 1
+    finally:
+        done.append(received)
+        writer.close()
+
+
+def leader(mode, host, port, count, interval):
+    """Child process: wait for "go" on stdin, then publish `count` messages"""
+    if mode == "embedded":
+        broker = EmbeddedBroker(host, port)
+        broker.start()
+        publish = lambda payload: broker.publish_threadsafe(TOPIC, payload)
+    else:
+        sock = socket.create_connection((host, port))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        body = encode_string("MQIsdp") + bytes([3, 0x02]) + (300).to_bytes(2, "big") + encode_string("leader")
+        sock.sendall(packet(CONNECT, body))
+        sock.recv(4)
+        publish = lambda payload: sock.sendall(encode_publish(TOPIC, payload))
+    print("ready", flush=True)
+    sys.stdin.readline()
+    for _ in range(count):
+        publish("{},".format(time.monotonic_ns()).encode())
+        if interval:
+            time.sleep(interval)
+    sys.stdin.readline()
+
+
+async def run(mode, host, port, subscribers, count, interval):
+    child = subprocess.Popen([sys.executable, __file__, "--leader", mode, host, str(port), str(count),
+                              str(interval)], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        child.stdout.readline()
+        latencies, ready, done = [], [], []
+        tasks = [asyncio.ensure_future(follower(host, port, index, count, latencies, ready, done))
+                 for index in range(subscribers)]
+        while len(ready) < subscribers:
+            await asyncio.sleep(0.01)
+        start = time.perf_counter()
+        child.stdin.write("go\n")
+        child.stdin.flush()
+        await asyncio.wait(tasks, timeout=max(10.0, count * interval * 2))
+        elapsed = time.perf_counter() - start
+        for task in tasks:
+            task.cancel()
+        await asyncio.sleep(0)
+    finally:
+        child.stdin.write("done\n")
+        child.stdin.close()
+        child.wait()
+    return latencies, sum(done) if done else len(latencies), elapsed
+
+
+def report(name, subscribers, count, latencies, delivered, elapsed):
+    latencies.sort()
+    if not latencies:
+        print("{:<10} nothing delivered".format(name))
+        return
+    print("{:<10} {:>4} subscribers  median {:>7.2f} ms  p99 {:>7.2f} ms  delivered {:>6.1%}  {:>9.0f} msg/s".format(
+        name, subscribers, latencies[len(latencies) // 2] / 1e6, latencies[int(len(latencies) * 0.99)] / 1e6,
+        len(latencies) / (subscribers * count), len(latencies) / elapsed))
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--leader":
+        mode, host, port, count, interval = sys.argv[2:7]
+        leader(mode, host, int(port), int(count), float(interval))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--external", help="host:port of an external broker, default runs broker.py as a stand-in")
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[10, 100, 300])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=0.005, help="seconds between messages, 0 for a burst")
+    args = parser.parse_args()
+
+    external_process = None
+    if args.external:
+        external_host, external_port = args.external.rsplit(":", 1)
+        external_port = int(external_port)
+    else:
+        external_host, external_port = "127.0.0.1", free_port()
+        external_process = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(__file__), "broker.py"),
+                                             str(external_port)], stderr=subprocess.DEVNULL)
+        time.sleep(0.5)
+    try:
+        for subscribers in args.subscribers:
+            for name, host, port in (("embedded", "127.0.0.1", free_port()),
+                                     ("external", external_host, external_port)):
+                latencies, delivered, elapsed = asyncio.run(
+                    run(name, host, port, subscribers, args.messages, args.interval))
+                report(name, subscribers, args.messages, latencies, delivered, elapsed)
+    finally:
+        if external_process is not None:
+            external_process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Compares the 200 ms polling leader with the event driven state sampler.
+
+Uses the FakeMediaPlayer, so the numbers are the ctypes crossings per second
+of playback and how long it takes to notice the end of the stream, not the
+cost of libVLC itself. Calls into libVLC and event callbacks from libVLC
+into Python are counted apart, both cross ctypes.
+
+While playing, libVLC 3 sends TimeChanged and PositionChanged from the
+input thread's statistics update, every 250 ms, the fake is ticked at that
+rate.
+
+    python bench_player_state.py
+"""
+
+import queue
+import random
+import threading
+import time
+
+from fakeplayer import FakeMediaPlayer, FakeEventType
+from playerstate import PlayerStateSampler, ENDED
+
+UI_INTERVAL = 0.2
+# The input thread's interface update period in libVLC 3
+VLC_EVENT_INTERVAL = 0.25
+DURATION = 2.0
+TRIALS = 20
+
+
+def polling_update(player, pushed, was_playing):
+    """What update_ui and update_time_label used to do on every tick"""
+    media_pos = int(player.get_position() * 1000)
+    if media_pos >= 0 and player.is_playing():
+        player.get_time()
+    if not player.is_playing():
+        if was_playing[0]:
+            pushed.put(time.perf_counter())
+        was_playing[0] = False
+        return
+    was_playing[0] = True
+    player.get_time()
+
+
+def sampled_update(sampler):
+    """The same tick reading the sampled state"""
+    state = sampler.state
+    return int(state.position * 1000), state.is_playing, state.time
+
+
+def crossings(player, elapsed):
+    """(calls into libVLC, event callbacks from libVLC) per second"""
+    callbacks = sum(count for call, count in player.calls.items() if call.startswith("event "))
+    return (sum(player.calls.values()) - callbacks) / elapsed, callbacks / elapsed
+
+
+def run_periodic(interval, function, stop):
+    while not stop.wait(interval):
+        function()
+
+
+def polling_run():
+    player = FakeMediaPlayer()
+    pushed = queue.Queue()
+    was_playing = [False]
+    player.play()
+    player.calls.clear()
+    stop = threading.Event()
+    thread = threading.Thread(target=run_periodic,
+                              args=(UI_INTERVAL, lambda: polling_update(player, pushed, was_playing), stop))
+    start = time.perf_counter()
+    thread.start()
+    time.sleep(DURATION)
+    rates = crossings(player, time.perf_counter() - start)
+
+    latencies = []
+    for _ in range(TRIALS):
+        time.sleep(random.uniform(0, UI_INTERVAL))
+        ended_at = time.perf_counter()
+        player.end()
+        latencies.append(pushed.get() - ended_at)
+        player.play()
+        # Give the poller a tick to see the playback again
+        time.sleep(UI_INTERVAL * 1.5)
+    stop.set()
+    thread.join()
+    return rates, latencies
+
+
+def sampler_run():
+    player = FakeMediaPlayer()
+    sampler = PlayerStateSampler(player, FakeEventType)
+    pushed = queue.Queue()
+    sampler.add_listener(lambda change, state: change == ENDED and pushed.put(time.perf_counter()))
+    player.play()
+    player.calls.clear()
+    stop = threading.Event()
+    threads = [threading.Thread(target=run_periodic, args=(UI_INTERVAL, lambda: sampled_update(sampler), stop)),
+               threading.Thread(target=run_periodic, args=(VLC_EVENT_INTERVAL, player.tick, stop))]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    rates = crossings(player, time.perf_counter() - start)
+
+    latencies = []
+    for _ in range(TRIALS):
+        time.sleep(random.uniform(0, UI_INTERVAL))
+        ended_at = time.perf_counter()
+        player.end()
+        latencies.append(pushed.get() - ended_at)
+        player.play()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return rates, latencies
+
+
+def main():
+    for name, run in (("polling", polling_run), ("event sampler", sampler_run)):
+        rates, latencies = run()
+        latencies.sort()
+        print("{:<14} {:>5.1f} calls/s + {:>4.1f} event callbacks/s into libVLC and back   "
+              "end of stream noticed after median {:>7.3f} ms, max {:>7.3f} ms".format(name, *rates,
+                                                         latencies[len(latencies) // 2] * 1000,
+                                                         latencies[-1] * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Measures the per-message cost of the follower's receive path.
+
+The "print" variant is the receiver as it was before the queue based
+logging, printing every payload to stdout. Run it with stdout attached to
+the console you want to measure, e.g.:
+
+    python bench_receive.py
+    python bench_receive.py > /dev/null
+"""
+
+import logging
+import queue
+import sys
+import time
+
+from networkmqtt import Client
+from eventlog import setup_logging, shutdown_logging
+
+MESSAGES = 20000
+
+
+class Message:
+    def __init__(self, payload):
+        self.payload = payload
+
+
+def print_receiver(client, userdata, message, data_queue):
+    """The receive path with the print() calls it used to have"""
+    data = str(message.payload.decode())
+    print("Received: ")
+    print(data)
+    if data:
+        for chara in data.split(','):
+            if chara:
+                if chara == 'd':
+                    data_queue.queue.clear()
+                else:
+                    data_queue.put(chara)
+
+
+def run(receive, data_queue):
+    message = Message(b"123456,")
+    start = time.perf_counter()
+    for _ in range(MESSAGES):
+        receive(None, None, message)
+        data_queue.queue.clear()
+    return (time.perf_counter() - start) / MESSAGES * 1e6
+
+
+def main():
+    results = []
+    data_queue = queue.Queue()
+    results.append(("print", run(lambda c, u, m: print_receiver(c, u, m, data_queue), data_queue)))
+
+    client = Client.__new__(Client)
+    client.data_queue = data_queue
+    setup_logging(logging.INFO)
+    results.append(("logging, INFO console", run(client.data_receiver, data_queue)))
+    logging.getLogger().setLevel(logging.DEBUG)
+    results.append(("logging, DEBUG console", run(client.data_receiver, data_queue)))
+    shutdown_logging()
+
+    for name, per_message in results:
+        sys.stderr.write("{:<24}{:>8.2f} us/message\n".format(name, per_message))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+End-to-end sync error through a chain of relays on one machine.
+
+Every level of the tree is an embedded broker stand-in. Between a broker
+and the relay below it sits a TCP proxy that delays traffic by --delay ms
+in each direction, standing in for the WAN link. A follower on the last
+broker compares every media time it receives with the leader's clock.
+
+The leader sends a heartbeat every 5 seconds like the player does, so a
+run needs to last a while for the relays to have heartbeats to coalesce.
+
+    python bench_relay.py
+    python bench_relay.py --depths 0 1 2 4 8 --delay 40 --duration 60
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from broker import PUBLISH, EmbeddedBroker, decode_string, encode_subscribe, open_client, read_packet
+from relay import Relay
+
+TOPIC = "bench"
+
+
+async def delayed_pipe(reader, writer, delay):
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            # Equal delays keep the order of the chunks
+            loop.call_later(delay, writer.write, data)
+    finally:
+        loop.call_later(delay, writer.close)
+
+
+async def start_proxy(target_port, delay):
+    async def handle(reader, writer):
+        target_reader, target_writer = await asyncio.open_connection("127.0.0.1", target_port)
+        await asyncio.gather(delayed_pipe(reader, target_writer, delay),
+                             delayed_pipe(target_reader, writer, delay), return_exceptions=True)
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+class Leader:
+    """Plays an imaginary clip and publishes like the player's Server does, one token per message
+
+    A heartbeat goes out every `heartbeat` seconds, 5 in the player, and the
+    leader seeks 10 seconds ahead every `seek_every` seconds.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.started_at = None
+        self.start_time = 0
+
+    def clock(self, now=None):
+        now = time.monotonic() if now is None else now
+        return self.start_time + (now - self.started_at) * 1000
+
+    def send(self, value):
+        self.broker.publish("$" + TOPIC, "{},".format(value).encode())
+
+    async def play(self, duration, heartbeat=5.0, seek_every=20.0):
+        self.started_at = time.monotonic()
+        for value in ('d', 'P', int(self.clock())):
+            self.send(value)
+        last_seek = time.monotonic()
+        while time.monotonic() - self.started_at < duration:
+            await asyncio.sleep(heartbeat)
+            if time.monotonic() - last_seek >= seek_every:
+                self.start_time += 10000
+                last_seek = time.monotonic()
+                self.send('d')
+            self.send(int(self.clock()))
+
+
+async def follower(port, leader, errors):
+    reader, writer = await open_client("127.0.0.1", port, "follower")
+    writer.write(encode_subscribe("$" + TOPIC + "/#"))
+    try:
+        while True:
+            packet_type, flags, body = await read_packet(reader)
+            if packet_type != PUBLISH or leader.started_at is None:
+                continue
+            now = time.monotonic()
+            topic, offset = decode_string(body, 0)
+            for token in bytes(body[offset:]).decode().split(','):
+                if token.lstrip('-').isdigit():
+                    errors.append(leader.clock(now) - int(token))
+    finally:
+        writer.close()
+
+
+async def run(depth, delay, compensate, duration, heartbeat):
+    root = EmbeddedBroker("127.0.0.1", 0)
+    await root.serve()
+    servers = []
+    tasks = []
+    relays = []
+    port = root.port
+    for level in range(depth):
+        proxy, proxy_port = await start_proxy(port, delay)
+        servers.append(proxy)
+        relay = Relay("relay-{}".format(level), "127.0.0.1", proxy_port, TOPIC, listen_port=0, compensate=compensate,
+                      probe_interval=0.25)
+        relays.append(relay)
+        tasks.append(asyncio.ensure_future(relay.run()))
+        while relay.broker is None or relay.broker.server is None:
+            await asyncio.sleep(0.01)
+        port = relay.broker.port
+
+    leader = Leader(root)
+    errors = []
+    tasks.append(asyncio.ensure_future(follower(port, leader, errors)))
+    # Let the relays connect and measure their upstream latency
+    await asyncio.sleep(1.0 + 4 * delay * depth)
+    await leader.play(duration, heartbeat)
+    await asyncio.sleep(2 * delay * depth + 0.1)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await root.close()
+    for server in servers:
+        server.close()
+    # Let the connections wind down before the loop goes away
+    await asyncio.sleep(2 * delay + 0.05)
+    return errors, sum(relay.coalesced for relay in relays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--delay", type=float, default=20, help="one way delay per hop in ms")
+    parser.add_argument("--duration", type=float, default=40.0, help="seconds of playback per run")
+    parser.add_argument("--heartbeat", type=float, default=5.0, help="seconds between the leader's heartbeats")
+    args = parser.parse_args()
+
+    for depth in args.depths:
+        for compensate in (False, True):
+            errors, coalesced = asyncio.run(run(depth, args.delay / 1000, compensate, args.duration,
+                                                      args.heartbeat))
+            if not errors:
+                print("depth {} nothing received".format(depth))
+                continue
+            print("depth {}  {:<15} mean error {:>7.1f} ms  max |error| {:>7.1f} ms  "
+                  "{:>3} times received, {:>3} heartbeats coalesced".format(
+                      depth, "compensated" if compensate else "plain forward", statistics.mean(errors),
+                      max(abs(error) for error in errors), len(errors), coalesced))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,485 @@
+#
+# PyQt5-based video-sync example for VLC Python bindings
+# Copyright (C) 2009-2010 the VideoLAN team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+#
+"""
+A small asyncio MQTT broker that can run inside the leader.
+
+Only the part of MQTT 3.1, 3.1.1 and 5 that the sync protocol needs is
+supported: CONNECT, PUBLISH, SUBSCRIBE, UNSUBSCRIBE, PINGREQ and DISCONNECT.
+Messages are delivered with QoS 0, incoming QoS 1 and 2 publishes are
+acknowledged. There is no authentication, no persistent sessions, no will
+messages and no MQTT 5 topic aliases.
+
+Every client has a bounded outbound queue. When a slow client falls behind
+its oldest messages are dropped, the other clients are never held up.
+"""
+
+import asyncio
+import collections
+import contextlib
+import itertools
+import logging
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+PUBREC = 5
+PUBREL = 6
+PUBCOMP = 7
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+MQTT_5 = 5
+
+
+class ProtocolError(Exception):
+    """The peer sent something the broker does not understand"""
+
+
+def encode_length(length):
+    encoded = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length:
+            byte |= 0x80
+        encoded.append(byte)
+        if not length:
+            return bytes(encoded)
+
+
+def encode_string(value):
+    if isinstance(value, str):
+        value = value.encode()
+    return len(value).to_bytes(2, "big") + value
+
+
+def decode_string(data, offset):
+    length = int.from_bytes(data[offset:offset + 2], "big")
+    end = offset + 2 + length
+    if end > len(data):
+        raise ProtocolError("string runs past the end of the packet")
+    return bytes(data[offset + 2:end]), end
+
+
+def decode_text(data):
+    try:
+        return data.decode()
+    except UnicodeDecodeError:
+        raise ProtocolError("string is not valid UTF-8")
+
+
+def check_length(data, end, name):
+    if len(data) < end:
+        raise ProtocolError("{} packet too short".format(name))
+
+
+def decode_varint(data, offset):
+    value = 0
+    for shift in range(0, 28, 7):
+        if offset >= len(data):
+            break
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+    raise ProtocolError("malformed variable byte integer")
+
+
+def skip_properties(data, offset):
+    length, offset = decode_varint(data, offset)
+    return offset + length
+
+
+def packet(packet_type, body, flags=0):
+    return bytes([packet_type << 4 | flags]) + encode_length(len(body)) + body
+
+
+def encode_publish(topic, payload, version=4, retain=False):
+    """A QoS 0 PUBLISH packet for a client speaking `version`"""
+    body = encode_string(topic)
+    if version == MQTT_5:
+        body += b"\x00"
+    return packet(PUBLISH, body + payload, 1 if retain else 0)
+
+
+async def read_packet(reader):
+    """Read one packet, returns (packet type, flags, body)"""
+    header = (await reader.readexactly(1))[0]
+    length = 0
+    for shift in range(0, 28, 7):
+        byte = (await reader.readexactly(1))[0]
+        length |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            break
+    else:
+        raise ProtocolError("malformed remaining length")
+    body = await reader.readexactly(length) if length else b""
+    return header >> 4, header & 0x0F, body
+
+
+async def open_client(host, port, client_id, keepalive=60):
+    """Connect to a broker as a plain MQTT 3.1.1 client, returns (reader, writer)"""
+    reader, writer = await asyncio.open_connection(host, port)
+    body = encode_string("MQTT") + bytes([4, 0x02]) + keepalive.to_bytes(2, "big") + encode_string(client_id)
+    writer.write(packet(CONNECT, body))
+    packet_type, flags, body = await read_packet(reader)
+    if packet_type != CONNACK or len(body) < 2 or body[1]:
+        writer.close()
+        raise ProtocolError("connection refused by {}:{}".format(host, port))
+    return reader, writer
+
+
+def encode_subscribe(topic_filter, packet_id=1):
+    return packet(SUBSCRIBE, packet_id.to_bytes(2, "big") + encode_string(topic_filter) + b"\x00", 2)
+
+
+def topic_matches(topic_filter, topic):
+    """MQTT wildcard matching, '#' and '+' never match topics starting with '$'"""
+    if topic_filter == topic:
+        return True
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    if topic.startswith("$") and filter_levels[0] in ("#", "+"):
+        return False
+    for index, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if index >= len(topic_levels):
+            return False
+        if level != "+" and level != topic_levels[index]:
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+class Session:
+    """One connected client"""
+
+    def __init__(self, broker, reader, writer):
+        self.broker = broker
+        self.reader = reader
+        self.writer = writer
+        self.client_id = None
+        self.version = 4
+        self.keepalive = 0
+        self.subscriptions = {}
+        self.outbox = collections.deque(maxlen=broker.queue_size)
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+        self.task = None
+
+    def enqueue(self, packets):
+        """Queue a PUBLISH, `packets` maps protocol version to the encoded packet"""
+        if len(self.outbox) == self.outbox.maxlen:
+            self.dropped += 1
+            if self.dropped % self.outbox.maxlen == 1:
+                logger.warning("Client %s is too slow, %d messages dropped", self.client_id, self.dropped)
+        self.outbox.append(packets[MQTT_5 if self.version == MQTT_5 else 4])
+        self.wakeup.set()
+
+    def send(self, data):
+        """Write a control packet right away, bypassing the outbound queue"""
+        self.writer.write(data)
+
+    async def write_outbox(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while self.outbox:
+                self.writer.write(self.outbox.popleft())
+            await self.writer.drain()
+
+    async def run(self):
+        packet_type, flags, body = await asyncio.wait_for(read_packet(self.reader), self.broker.connect_timeout)
+        if packet_type != CONNECT:
+            raise ProtocolError("expected CONNECT")
+        self.handle_connect(body)
+        self.broker.register(self)
+
+        writer_task = asyncio.ensure_future(self.write_outbox())
+        try:
+            while True:
+                timeout = self.keepalive * 1.5 if self.keepalive else None
+                packet_type, flags, body = await asyncio.wait_for(read_packet(self.reader), timeout)
+                if packet_type == DISCONNECT:
+                    return
+                self.handle(packet_type, flags, body)
+                if writer_task.done():
+                    writer_task.result()
+        finally:
+            writer_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await writer_task
+
+    def handle_connect(self, body):
+        protocol, offset = decode_string(body, 0)
+        if protocol not in (b"MQTT", b"MQIsdp"):
+            raise ProtocolError("unknown protocol {!r}".format(protocol))
+        check_length(body, offset + 4, "CONNECT")
+        self.version = body[offset]
+        connect_flags = body[offset + 1]
+        self.keepalive = int.from_bytes(body[offset + 2:offset + 4], "big")
+        offset += 4
+        if self.version == MQTT_5:
+            offset = skip_properties(body, offset)
+        client_id, offset = decode_string(body, offset)
+        # Will, username and password are read past and ignored
+        self.client_id = decode_text(client_id) or "auto-{}".format(next(self.broker.client_ids))
+
+        if self.version == MQTT_5:
+            self.send(packet(CONNACK, b"\x00\x00\x00"))
+        elif self.version in (3, 4):
+            self.send(packet(CONNACK, b"\x00\x00"))
+        else:
+            # Return code 1: unacceptable protocol version
+            self.send(packet(CONNACK, b"\x00\x01"))
+            raise ProtocolError("unsupported protocol level {}".format(self.version))
+        if not connect_flags & 0x02:
+            logger.debug("Client %s asked for a persistent session, using a clean one", self.client_id)
+
+    def handle(self, packet_type, flags, body):
+        if packet_type == PUBLISH:
+            self.handle_publish(flags, body)
+        elif packet_type == SUBSCRIBE:
+            self.handle_subscribe(body)
+        elif packet_type == UNSUBSCRIBE:
+            self.handle_unsubscribe(body)
+        elif packet_type == PINGREQ:
+            self.send(packet(PINGRESP, b""))
+        elif packet_type == PUBREL:
+            check_length(body, 2, "PUBREL")
+            self.send(packet(PUBCOMP, body[:2] + (b"\x00" if self.version == MQTT_5 else b"")))
+        elif packet_type in (PUBACK, PUBREC, PUBCOMP):
+            pass
+        else:
+            raise ProtocolError("unexpected packet type {}".format(packet_type))
+
+    def handle_publish(self, flags, body):
+        qos = (flags >> 1) & 0x03
+        if qos == 3:
+            raise ProtocolError("PUBLISH with QoS 3")
+        topic, offset = decode_string(body, 0)
+        packet_id = None
+        if qos:
+            check_length(body, offset + 2, "PUBLISH")
+            packet_id = body[offset:offset + 2]
+            offset += 2
+        if self.version == MQTT_5:
+            offset = skip_properties(body, offset)
+        self.broker.publish(decode_text(topic), bytes(body[offset:]), bool(flags & 0x01))
+        suffix = b"\x00" if self.version == MQTT_5 else b""
+        if qos == 1:
+            self.send(packet(PUBACK, packet_id + suffix))
+        elif qos == 2:
+            self.send(packet(PUBREC, packet_id + suffix))
+
+    def handle_subscribe(self, body):
+        check_length(body, 2, "SUBSCRIBE")
+        packet_id = body[:2]
+        offset = 2
+        if self.version == MQTT_5:
+            offset = skip_properties(body, offset)
+        topic_filters = []
+        while offset < len(body):
+            topic_filter, offset = decode_string(body, offset)
+            offset += 1
+            topic_filters.append(decode_text(topic_filter))
+        if not topic_filters:
+            raise ProtocolError("SUBSCRIBE without topic filters")
+        for topic_filter in topic_filters:
+            self.subscriptions[topic_filter] = 0
+        self.broker.routes.clear()
+
+        properties = b"\x00" if self.version == MQTT_5 else b""
+        self.send(packet(SUBACK, packet_id + properties + bytes(len(topic_filters))))
+        for topic_filter in topic_filters:
+            for topic, packets in self.broker.retained.items():
+                if topic_matches(topic_filter, topic):
+                    self.enqueue(packets)
+
+    def handle_unsubscribe(self, body):
+        check_length(body, 2, "UNSUBSCRIBE")
+        packet_id = body[:2]
+        offset = 2
+        if self.version == MQTT_5:
+            offset = skip_properties(body, offset)
+        count = 0
+        while offset < len(body):
+            topic_filter, offset = decode_string(body, offset)
+            self.subscriptions.pop(decode_text(topic_filter), None)
+            count += 1
+        self.broker.routes.clear()
+        if self.version == MQTT_5:
+            self.send(packet(UNSUBACK, packet_id + b"\x00" + bytes(count)))
+        else:
+            self.send(packet(UNSUBACK, packet_id))
+
+
+class EmbeddedBroker:
+    """MQTT broker running on its own asyncio loop in a background thread
+
+    `queue_size` is the number of messages kept for each client before the
+    oldest ones are dropped.
+    """
+
+    def __init__(self, host="0.0.0.0", port=1883, queue_size=256, connect_timeout=10):
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.connect_timeout = connect_timeout
+        self.sessions = {}
+        self.connections = set()
+        # topic -> sessions subscribed to it, rebuilt when subscriptions change
+        self.routes = {}
+        self.retained = {}
+        self.client_ids = itertools.count(1)
+        self.loop = None
+        self.server = None
+        self.thread = None
+
+    def register(self, session):
+        previous = self.sessions.get(session.client_id)
+        if previous is not None:
+            # Same client id connecting again, MQTT says the old connection goes
+            previous.writer.close()
+        self.sessions[session.client_id] = session
+        self.routes.clear()
+
+    def unregister(self, session):
+        if self.sessions.get(session.client_id) is session:
+            del self.sessions[session.client_id]
+            self.routes.clear()
+
+    def publish(self, topic, payload, retain=False):
+        """Fan a message out to every matching subscriber, must run on the broker loop"""
+        packets = {4: encode_publish(topic, payload), MQTT_5: encode_publish(topic, payload, MQTT_5)}
+        if retain:
+            if payload:
+                self.retained[topic] = {version: encode_publish(topic, payload, version, retain=True)
+                                        for version in (4, MQTT_5)}
+            else:
+                self.retained.pop(topic, None)
+        subscribers = self.routes.get(topic)
+        if subscribers is None:
+            subscribers = [session for session in self.sessions.values()
+                           if any(topic_matches(topic_filter, topic) for topic_filter in session.subscriptions)]
+            self.routes[topic] = subscribers
+        for session in subscribers:
+            session.enqueue(packets)
+
+    def publish_threadsafe(self, topic, payload, retain=False):
+        """Publish from outside the broker thread, e.g. from the leader's sender"""
+        self.loop.call_soon_threadsafe(self.publish, topic, payload, retain)
+
+    async def handle_client(self, reader, writer):
+        session = Session(self, reader, writer)
+        session.task = asyncio.current_task()
+        self.connections.add(session)
+        try:
+            await session.run()
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # close() ends the session, the stream server logs handlers that end cancelled
+            pass
+        except ProtocolError as error:
+            logger.warning("Dropping client %s: %s", session.client_id, error)
+        finally:
+            self.connections.discard(session)
+            self.unregister(session)
+            writer.close()
+
+    async def serve(self):
+        """Start listening on the running loop"""
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        if not self.port:
+            self.port = self.server.sockets[0].getsockname()[1]
+        logger.info("Embedded broker listening on %s:%d", self.host, self.port)
+
+    def start(self):
+        """Run the broker in a background thread, returns once it is listening"""
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            try:
+                self.loop.run_until_complete(self.serve())
+            except OSError as error:
+                errors.append(error)
+                ready.set()
+                return
+            ready.set()
+            self.loop.run_forever()
+            self.loop.close()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+
+    async def close(self):
+        """Stop listening and disconnect every client, must run on the broker loop"""
+        self.server.close()
+        tasks = [session.task for session in self.connections]
+        for task in tasks:
+            task.cancel()
+        # Each session closes its connection and ends its writer task on the way out
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.server.wait_closed()
+
+    def stop(self):
+        if self.loop is None:
+            return
+
+        async def shutdown():
+            await self.close()
+            self.loop.stop()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop)
+        self.thread.join()
+        self.loop = None
+
+
+def main():
+    """Run the broker on its own: python broker.py [port]"""
+    logging.basicConfig(level=logging.INFO)
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 1883
+    broker = EmbeddedBroker(port=port)
+    broker.start()
+    try:
+        broker.thread.join()
+    except KeyboardInterrupt:
+        broker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#
+# PyQt5-based video-sync example for VLC Python bindings
+# Copyright (C) 2009-2010 the VideoLAN team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+#
+"""
+Non-blocking logging for the player and the network threads.
+
+Records are handed to a queue and written to the console by a background
+thread, so a slow console never stalls the paho or the GUI thread. Every
+record also lands in an in-memory flight recorder that can be dumped on
+demand or when the application crashes.
+"""
+
+import collections
+import logging
+import logging.handlers
+import queue
+import signal
+import sys
+import threading
+import time
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener = None
+_recorder = None
+_rate_limit = None
+_flusher_stop = None
+
+
+class RateLimitFilter(logging.Filter):
+    """Limits how often the same event is logged
+
+    An event is identified by its logger and unformatted message, so
+    "Received %s" counts as one event no matter what the payload is.
+    The first `burst` records of an event in every `interval` seconds
+    pass, after that only every `sample_every`-th record gets through.
+    The number of records held back is logged once the window is over,
+    by the next record of the event or by flush().
+    """
+
+    def __init__(self, burst=10, interval=1.0, sample_every=100):
+        logging.Filter.__init__(self)
+        self.burst = burst
+        self.interval = interval
+        self.sample_every = sample_every
+        self.events = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        reported = 0
+        with self.lock:
+            window_start, count, suppressed, levelno = self.events.get(key, (now, 0, 0, record.levelno))
+            if now - window_start >= self.interval:
+                reported = suppressed
+                window_start, count, suppressed = now, 0, 0
+            count += 1
+            allowed = count <= self.burst or (count - self.burst) % self.sample_every == 0
+            if not allowed:
+                suppressed += 1
+            self.events[key] = (window_start, count, suppressed, record.levelno)
+        if reported:
+            self.report(record.name, record.msg, levelno, reported)
+        return allowed
+
+    def flush(self, force=False):
+        """Report what was held back in the windows that are over, in all of them when `force`
+
+        Called periodically, so the end of a flood is reported even when no
+        other record of the event comes along. Forgets the finished events.
+        """
+        now = time.monotonic()
+        reports = []
+        with self.lock:
+            for key, (window_start, count, suppressed, levelno) in list(self.events.items()):
+                if force or now - window_start >= self.interval:
+                    del self.events[key]
+                    if suppressed:
+                        reports.append((key, levelno, suppressed))
+        for (name, msg), levelno, suppressed in reports:
+            self.report(name, msg, levelno, suppressed)
+
+    def report(self, name, msg, levelno, suppressed):
+        logging.getLogger(name).log(levelno, "%d similar messages suppressed: %s", suppressed, msg)
+
+
+class FlightRecorder(logging.Handler):
+    """Keeps the last `capacity` events in a ring buffer
+
+    Events are stored as plain tuples and only formatted by dump(), so
+    hot paths can add to it through trace() without building a LogRecord.
+    """
+
+    def __init__(self, capacity=2000):
+        logging.Handler.__init__(self, logging.DEBUG)
+        self.events = collections.deque(maxlen=capacity)
+        self.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    def add(self, name, levelname, msg, args, exc_text=None):
+        # deque.append with maxlen is atomic, no lock needed
+        self.events.append((time.time(), name, levelname, msg, args, exc_text))
+
+    def emit(self, record):
+        exc_text = None
+        if record.exc_info:
+            exc_text = self.formatter.formatException(record.exc_info)
+        self.add(record.name, record.levelname, record.msg, record.args, exc_text)
+
+    def dump(self, stream=None):
+        stream = stream or sys.stderr
+        events = list(self.events)
+        stream.write("---- flight recorder: last {} events ----\n".format(len(events)))
+        for created, name, levelname, msg, args, exc_text in events:
+            record = logging.makeLogRecord({"created": created, "msecs": (created % 1) * 1000, "name": name,
+                                            "levelname": levelname, "msg": msg, "args": args})
+            stream.write(self.format(record) + "\n")
+            if exc_text:
+                stream.write(exc_text + "\n")
+        stream.write("---- end of flight recorder ----\n")
+        stream.flush()
+
+
+def setup_logging(level=logging.INFO, capacity=2000, burst=10, interval=1.0, sample_every=100):
+    """Route all logging through a queue and the flight recorder
+
+    `level` is the console level, everything at or above it is also kept
+    by the flight recorder. Events passed to trace() are always recorded.
+    Safe to call more than once, later calls are ignored.
+    """
+    global _listener, _recorder, _rate_limit, _flusher_stop
+    if _listener is not None:
+        return _recorder
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    _rate_limit = RateLimitFilter(burst, interval, sample_every)
+    queue_handler.addFilter(_rate_limit)
+    _recorder = FlightRecorder(capacity)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_recorder)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, console)
+    _listener.start()
+
+    _flusher_stop = threading.Event()
+
+    def flush_rate_limit(stop):
+        while not stop.wait(interval):
+            _rate_limit.flush()
+
+    threading.Thread(target=flush_rate_limit, args=(_flusher_stop,), name="log-flusher", daemon=True).start()
+
+    previous_hook = sys.excepthook
+
+    def dump_on_crash(exc_type, exc_value, exc_traceback):
+        logging.getLogger(__name__).critical("Unhandled exception",
+                                             exc_info=(exc_type, exc_value, exc_traceback))
+        dump_flight_recorder()
+        previous_hook(exc_type, exc_value, exc_traceback)
+
+    sys.excepthook = dump_on_crash
+
+    previous_thread_hook = threading.excepthook
+
+    def dump_on_thread_crash(args):
+        if args.exc_type is not SystemExit:
+            thread_name = args.thread.name if args.thread is not None else "unknown"
+            logging.getLogger(__name__).critical("Unhandled exception in thread %s", thread_name,
+                                                 exc_info=(args.exc_type, args.exc_value, args.exc_traceback))
+            dump_flight_recorder()
+        previous_thread_hook(args)
+
+    threading.excepthook = dump_on_thread_crash
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: dump_flight_recorder())
+    return _recorder
+
+
+def trace(logger, msg, *args):
+    """Record a high frequency DEBUG event
+
+    The event always goes to the flight recorder, a LogRecord is only
+    created when the logger would actually output DEBUG messages.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(msg, *args)
+    elif _recorder is not None:
+        _recorder.add(logger.name, "DEBUG", msg, args)
+
+
+def dump_flight_recorder(stream=None):
+    """Write the recent events to `stream` (stderr by default)
+
+    Safe to call from any thread, a signal handler or the crash hooks, the
+    console thread keeps running while the snapshot is written.
+    """
+    if _recorder is not None:
+        _recorder.dump(stream)
+
+
+def shutdown_logging():
+    """Report the suppressed counts, flush the console queue and stop the background threads"""
+    global _listener
+    if _listener is not None:
+        _flusher_stop.set()
+        _rate_limit.flush(force=True)
+        _listener.stop()
+        _listener = None
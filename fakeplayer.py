@@ -0,0 +1,118 @@
+"""
+A stand-in for vlc.MediaPlayer that needs neither libVLC nor a display.
+
+It counts every call that would be a ctypes call into libVLC, and every
+event callback, which is a ctypes call from libVLC back into Python. The
+caller fires the media player events by hand, which is what the state
+sampler benchmarks need.
+"""
+
+import collections
+import time
+
+
+class FakeEventType:
+    MediaPlayerPlaying = "Playing"
+    MediaPlayerPaused = "Paused"
+    MediaPlayerStopped = "Stopped"
+    MediaPlayerEndReached = "EndReached"
+    MediaPlayerBuffering = "Buffering"
+    MediaPlayerTimeChanged = "TimeChanged"
+    MediaPlayerPositionChanged = "PositionChanged"
+
+
+class FakeEvent:
+    def __init__(self, event_type, **values):
+        self.type = event_type
+        self.u = collections.namedtuple("EventUnion", values)(**values)
+
+
+class FakeEventManager:
+    def __init__(self, calls):
+        self.calls = calls
+        self.callbacks = {}
+
+    def event_attach(self, event_type, callback, *args):
+        self.callbacks[event_type] = (callback, args)
+
+    def event_detach(self, event_type):
+        self.callbacks.pop(event_type, None)
+
+    def fire(self, event_type, **values):
+        if event_type in self.callbacks:
+            self.calls["event " + event_type] += 1
+            callback, args = self.callbacks[event_type]
+            callback(FakeEvent(event_type, **values), *args)
+
+
+class FakeMediaPlayer:
+    """Plays an imaginary `length` ms long clip in wall clock time"""
+
+    def __init__(self, length=60000):
+        self.length = length
+        self.calls = collections.Counter()
+        self.events = FakeEventManager(self.calls)
+        self.started_at = None
+        self.start_time = 0
+        self.paused_time = 0
+        self.rate = 1.0
+
+    def event_manager(self):
+        return self.events
+
+    def current_time(self):
+        if self.started_at is None:
+            return self.paused_time
+        return min(self.length, self.start_time + int((time.perf_counter() - self.started_at) * 1000 * self.rate))
+
+    def play(self):
+        self.calls["play"] += 1
+        self.start_time = self.paused_time
+        self.started_at = time.perf_counter()
+        self.events.fire(FakeEventType.MediaPlayerPlaying)
+        return 0
+
+    def pause(self):
+        self.calls["pause"] += 1
+        self.paused_time = self.current_time()
+        self.started_at = None
+        self.events.fire(FakeEventType.MediaPlayerPaused)
+
+    def stop(self):
+        self.calls["stop"] += 1
+        self.paused_time = 0
+        self.started_at = None
+        self.events.fire(FakeEventType.MediaPlayerStopped)
+
+    def end(self):
+        """Reach the end of the clip right now"""
+        self.paused_time = self.length
+        self.started_at = None
+        self.events.fire(FakeEventType.MediaPlayerEndReached)
+
+    def tick(self):
+        """Fire the periodic TimeChanged/PositionChanged events libVLC sends while playing"""
+        current = self.current_time()
+        self.events.fire(FakeEventType.MediaPlayerTimeChanged, new_time=current)
+        self.events.fire(FakeEventType.MediaPlayerPositionChanged, new_position=current / self.length)
+
+    def is_playing(self):
+        self.calls["is_playing"] += 1
+        return self.started_at is not None
+
+    def get_time(self):
+        self.calls["get_time"] += 1
+        return self.current_time()
+
+    def get_position(self):
+        self.calls["get_position"] += 1
+        return self.current_time() / self.length
+
+    def get_rate(self):
+        self.calls["get_rate"] += 1
+        return self.rate
+
+    def set_rate(self, rate):
+        self.calls["set_rate"] += 1
+        self.rate = rate
+        return 0
@@ -20,29 +20,92 @@
 Based on the vlc videosync example from Saveliy Yusufov
 Author: Stefan Murawski | @steveway
 """
+import time
+
+STARTUP_T0 = time.perf_counter()
+
 import platform
 import sys
 import os
 import json
 import pathlib
 import queue
+import contextlib
+import logging
 
-import vlc
 from PySide2 import QtWidgets, QtGui, QtCore
-from PySide2.QtCore import QFile
-from PySide2.QtUiTools import QUiLoader as uic
 
 from networkmqtt import *
+from eventlog import setup_logging, trace, dump_flight_recorder, shutdown_logging
+from playerstate import PlayerStateSampler, StateAnnouncer
+
+logger = logging.getLogger(__name__)
+
+UI_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "videosync.ui")
+
+try:
+    # Generated with: pyside2-uic videosync.ui -o ui_videosync.py
+    from ui_videosync import Ui_MainWindow
+
+    class CompiledMainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
+        """Main window built from the precompiled ui_videosync module"""
+
+        def __init__(self, parent=None):
+            QtWidgets.QMainWindow.__init__(self, parent)
+            self.setupUi(self)
+except ImportError:
+    CompiledMainWindow = None
+
+# libvlc takes a while to load, it is only imported once a player is needed
+vlc = None
+
+
+def load_vlc():
+    """Import the vlc bindings on first use"""
+    global vlc
+    if vlc is None:
+        import vlc as vlc_module
+        vlc = vlc_module
+    return vlc
+
+
+class StartupProfiler:
+    """Collects the duration of each startup phase for --profile-startup"""
+
+    def __init__(self, start):
+        self.start = start
+        self.phases = []
+
+    def record(self, name, duration):
+        self.phases.append((name, duration))
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - begin)
+
+    def report(self):
+        print("Startup profile:")
+        for name, duration in self.phases:
+            print("  {:<16}{:>9.1f} ms".format(name, duration * 1000))
+        print("  {:<16}{:>9.1f} ms".format("total", (time.perf_counter() - self.start) * 1000))
 
 
 class Player(QtWidgets.QMainWindow):
     """A "master" Media Player using VLC and Qt
     """
 
-    def __init__(self, master=None):
+    def __init__(self, master=None, profiler=None):
         QtWidgets.QMainWindow.__init__(self, master)
-        # Create a basic vlc instance
-        self.instance = vlc.Instance()
+        self.profiler = profiler
+        self.first_paint_seen = False
+        # The vlc instance and media player are created on first use
+        self._instance = None
+        self._mediaplayer = None
+        self._state_sampler = None
 
         self.mqtt_connection = None
         self.current_ip = ""
@@ -51,20 +114,22 @@ class Player(QtWidgets.QMainWindow):
         self.current_topic = ""
         self.offset = 0
         self.is_connected = False
+        # Read from the libVLC event thread, so kept apart from the server checkbox
+        self.is_server = False
 
         self.media = None
         self.is_maximized = False
         self.is_visible = True
         self.last_update_time = 0
-        # Create an empty vlc media player
-        self.mediaplayer = self.instance.media_player_new()
 
-        self.create_ui()
+        with self.profile("ui construction"):
+            self.create_ui()
         try:
             self.load_settings()
         except (FileNotFoundError, json.decoder.JSONDecodeError):
             pass
         self.data_queue = queue.Queue()
+        self.announcer = StateAnnouncer(self.data_queue, lambda: self.is_server and self.is_connected)
         self.is_paused = False
         self.gui_timer = QtCore.QTimer(self)
         self.timer = QtCore.QTimer(self)
@@ -73,10 +138,48 @@ class Player(QtWidgets.QMainWindow):
         self.timer.timeout.connect(self.update_ui_client)
         self.timer.start()
 
+    def profile(self, name):
+        """Time a startup phase if --profile-startup was given"""
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.phase(name)
+
+    @property
+    def instance(self):
+        if self._instance is None:
+            self.init_vlc()
+        return self._instance
+
+    @property
+    def mediaplayer(self):
+        if self._mediaplayer is None:
+            self.init_vlc()
+        return self._mediaplayer
+
+    @property
+    def state_sampler(self):
+        if self._state_sampler is None:
+            self.init_vlc()
+        return self._state_sampler
+
+    def init_vlc(self):
+        """Create the vlc instance, an empty media player and its state sampler"""
+        with self.profile("vlc init"):
+            self._instance = load_vlc().Instance()
+            self._mediaplayer = self._instance.media_player_new()
+            self._state_sampler = PlayerStateSampler(self._mediaplayer, vlc.EventType)
+            self._state_sampler.add_listener(self.announcer.on_change)
+
+    def finish_startup_profile(self):
+        """Time the vlc init after the first paint, the broker connect is added when the user connects"""
+        if self._mediaplayer is None:
+            self.init_vlc()
+        self.profiler.report()
+
     def create_ui(self):
         """Set up the user interface, signals & slots
         """
-        self.main_window = self.load_ui_widget(os.path.join(os.getcwd(), "videosync.ui"))
+        self.main_window = self.load_ui_widget(UI_FILE)
         self.main_window.centralwidget.setLayout(self.main_window.vboxlayout)
 
         # In this widget, the video will be drawn
@@ -123,25 +226,29 @@ class Player(QtWidgets.QMainWindow):
 
         self.main_window.videoframe.keyPressEvent = self.on_move
 
-        # File menu
+        # File menu, the audio and subtitle menus are added once a file is loaded
         file_menu = self.main_window.menu_bar.addMenu("File")
-        self.audio_lang_menu = self.main_window.menu_bar.addMenu("Audio")
-        self.sub_lang_menu = self.main_window.menu_bar.addMenu("Subtitles")
+        self.audio_lang_menu = None
+        self.sub_lang_menu = None
 
         # Create actions to load a new media file and to close the app
         open_action = QtWidgets.QAction("Load Video", self)
+        dump_log_action = QtWidgets.QAction("Dump Event Log", self)
         close_action = QtWidgets.QAction("Close App", self)
         file_menu.addAction(open_action)
+        file_menu.addAction(dump_log_action)
         file_menu.addAction(close_action)
         # test_combo = QtWidgets.QComboBox()
         # self.main_window.menu_bar.addWidget(test_combo)
         open_action.triggered.connect(self.open_file)
+        dump_log_action.triggered.connect(lambda: dump_flight_recorder())
         close_action.triggered.connect(sys.exit)
         self.main_window.videoframe.setFocus()
         self.main_window.installEventFilter(self)
         self.main_window.ip_address.textChanged.connect(self.update_mqtt)
         self.main_window.client_id_input.textChanged.connect(self.update_mqtt)
         self.main_window.topic_input.textChanged.connect(self.update_mqtt)
+        self.main_window.embedded_broker_input.stateChanged.connect(self.update_mqtt)
         self.main_window.server_input.stateChanged.connect(self.change_server_state)
         self.main_window.connect_button.clicked.connect(self.connect_to_mqtt)
         self.main_window.top_control_box.setEnabled(False)
@@ -150,6 +257,11 @@ class Player(QtWidgets.QMainWindow):
         self.main_window.incr_pb_rate.setEnabled(False)
         self.main_window.stopbutton.setEnabled(False)
 
+    def create_track_menus(self):
+        if self.audio_lang_menu is None:
+            self.audio_lang_menu = self.main_window.menu_bar.addMenu("Audio")
+            self.sub_lang_menu = self.main_window.menu_bar.addMenu("Subtitles")
+
     def update_volume(self, event=None):
         self.mediaplayer.audio_set_volume(self.main_window.volume_slider.value())
 
@@ -162,6 +274,8 @@ class Player(QtWidgets.QMainWindow):
         self.main_window.offset_label.setText("Offset: {}ms".format(self.offset))
 
     def change_server_state(self, event=None):
+        self.is_server = self.main_window.server_input.isChecked()
+        self.main_window.embedded_broker_input.setEnabled(self.is_server)
         if self.main_window.server_input.isChecked():
             self.main_window.previousframe.clicked.disconnect()
             self.main_window.nextframe.clicked.disconnect()
@@ -195,18 +309,25 @@ class Player(QtWidgets.QMainWindow):
 
     def connect_to_mqtt(self, event=None):
         if not self.is_connected:
-            if self.main_window.server_input.isChecked():
-                self.mqtt_connection = Server(self.current_id, self.current_ip, self.current_port, self.current_topic,
-                                              self.data_queue)
-            else:
-                self.mqtt_connection = Client(self.current_id, self.current_ip, self.current_port, self.current_topic,
-                                              self.data_queue)
+            with self.profile("broker connect"):
+                if self.main_window.server_input.isChecked() and self.main_window.embedded_broker_input.isChecked():
+                    self.mqtt_connection = EmbeddedServer(self.current_id, self.current_ip, self.current_port,
+                                                          self.current_topic, self.data_queue)
+                elif self.main_window.server_input.isChecked():
+                    self.mqtt_connection = Server(self.current_id, self.current_ip, self.current_port,
+                                                  self.current_topic, self.data_queue)
+                else:
+                    self.mqtt_connection = Client(self.current_id, self.current_ip, self.current_port,
+                                                  self.current_topic, self.data_queue)
+            if self.profiler is not None:
+                self.profiler.report()
             self.is_connected = True
             self.main_window.connect_button.setText("Disconnect")
             self.main_window.ip_address.setEnabled(False)
             self.main_window.client_id_input.setEnabled(False)
             self.main_window.topic_input.setEnabled(False)
             self.main_window.server_input.setEnabled(False)
+            self.main_window.embedded_broker_input.setEnabled(False)
         else:
             self.mqtt_connection.disconnect()
             self.mqtt_connection = None
@@ -216,6 +337,7 @@ class Player(QtWidgets.QMainWindow):
             self.main_window.client_id_input.setEnabled(True)
             self.main_window.topic_input.setEnabled(True)
             self.main_window.server_input.setEnabled(True)
+            self.main_window.embedded_broker_input.setEnabled(self.is_server)
 
     def update_mqtt(self, event=None):
         self.current_ip = self.main_window.ip_address.text()
@@ -229,12 +351,14 @@ class Player(QtWidgets.QMainWindow):
         self.main_window.ip_address.setText(json_data["ip"])
         self.main_window.client_id_input.setText(json_data["id"])
         self.main_window.topic_input.setText(json_data["topic"])
+        self.main_window.embedded_broker_input.setChecked(json_data.get("embedded_broker", False))
         self.main_window.setGeometry(*json_data["window_coords"])
         load_file.close()
 
     def save_settings(self):
         save_file = open("settings.json", "w")
         json_data = {"ip": str(self.current_ip), "id": str(self.current_id), "topic": str(self.current_topic),
+                     "embedded_broker": self.main_window.embedded_broker_input.isChecked(),
                      "window_coords": [self.main_window.geometry().x(), self.main_window.geometry().y(),
                                        self.main_window.geometry().width(), self.main_window.geometry().height()]}
 
@@ -242,6 +366,13 @@ class Player(QtWidgets.QMainWindow):
         save_file.close()
 
     def load_ui_widget(self, ui_filename, parent=None):
+        if CompiledMainWindow is not None:
+            self.ui = CompiledMainWindow(parent)
+            return self.ui
+
+        # Fall back to parsing the .ui file when ui_videosync.py has not been generated
+        from PySide2.QtCore import QFile
+        from PySide2.QtUiTools import QUiLoader as uic
         loader = uic()
         file = QFile(ui_filename)
         file.open(QFile.ReadOnly)
@@ -250,6 +381,11 @@ class Player(QtWidgets.QMainWindow):
         return self.ui
 
     def eventFilter(self, object_, event):
+        if self.profiler is not None and not self.first_paint_seen and event.type() == QtCore.QEvent.Paint:
+            self.first_paint_seen = True
+            self.profiler.record("first paint", time.perf_counter() - self.profiler.start)
+            # Finish the profile once the paint is done
+            QtCore.QTimer.singleShot(0, self.finish_startup_profile)
         if object_ == self.main_window.topic_input:
             return False
         if event.type() == QtCore.QEvent.KeyPress:
@@ -305,34 +441,37 @@ class Player(QtWidgets.QMainWindow):
         """
         if self.mediaplayer.is_playing():
             signal = 'p'
+            self.announcer.expect(signal)
             self.mediaplayer.pause()
             self.main_window.playbutton.setIcon(self.style().standardIcon(QtWidgets.QStyle.SP_MediaPlay))
             self.is_paused = True
             self.timer.stop()
         else:
+            signal = 'P'
+            self.announcer.expect(signal)
             if self.mediaplayer.play() == -1:
+                self.announcer.expect(None)
                 self.open_file()
                 return
 
-            signal = 'P'
             self.mediaplayer.play()
+            # Don't let the next update see the end of the previous run before libVLC reports Playing,
+            # and pick up a rate changed while we were not playing
+            self.state_sampler.update(ended=False, rate=self.mediaplayer.get_rate())
             self.main_window.playbutton.setIcon(self.style().standardIcon(QtWidgets.QStyle.SP_MediaPause))
             self.timer.start()
             self.is_paused = False
 
         # Reset the queue & send the appropriate signal, i.e., play/pause
-        if self.main_window.server_input.isChecked():
-            if self.is_connected:
-                self.data_queue.queue.clear()
-                self.data_queue.put('d')
-                self.data_queue.put(signal)
-                if not self.is_paused:
-                    current_time = self.mediaplayer.get_time()
-                    self.data_queue.put(current_time)
+        if self.is_paused:
+            self.announcer.send(signal)
+        else:
+            self.announcer.send(signal, self.mediaplayer.get_time())
 
     def stop(self):
         """Stop player
         """
+        self.announcer.expect('S')
         self.mediaplayer.stop()
         self.main_window.playbutton.setIcon(self.style().standardIcon(QtWidgets.QStyle.SP_MediaPlay))
 
@@ -341,11 +480,7 @@ class Player(QtWidgets.QMainWindow):
         self.main_window.timelabel.setText(reset_time.toString())
 
         # Reset the queue
-        if self.main_window.server_input.isChecked():
-            if self.is_connected:
-                self.data_queue.queue.clear()
-                self.data_queue.put('d')
-                self.data_queue.put('S')
+        self.announcer.send('S')
 
         # Reset the media position slider
         self.main_window.positionslider.setValue(0)
@@ -399,6 +534,7 @@ class Player(QtWidgets.QMainWindow):
         rate = self.mediaplayer.get_rate() * 2
         result = self.mediaplayer.set_rate(rate)
         if result == 0:
+            self.state_sampler.rate_changed(rate)
             if self.main_window.server_input.isChecked():
                 if self.is_connected:
                     self.data_queue.queue.clear()
@@ -414,6 +550,7 @@ class Player(QtWidgets.QMainWindow):
         rate = self.mediaplayer.get_rate() * 0.5
         result = self.mediaplayer.set_rate(rate)
         if result == 0:
+            self.state_sampler.rate_changed(rate)
             if self.main_window.server_input.isChecked():
                 if self.is_connected:
                     self.data_queue.queue.clear()
@@ -452,12 +589,13 @@ class Player(QtWidgets.QMainWindow):
         elif platform.system() == "Darwin":  # for MacOS
             self.mediaplayer.set_nsobject(int(self.main_window.videoframe.winId()))
 
+        self.create_track_menus()
         list_of_track_actions = []
         self.audio_lang_menu.clear()
         tracks = self.media.tracks_get()
         for track in tracks:
             if track.type == vlc.TrackType.audio:
-                print(track)
+                logger.debug("Audio track: %s", track)
                 track_desc = "None"
                 try:
                     track_desc = track.description.decode()
@@ -480,7 +618,7 @@ class Player(QtWidgets.QMainWindow):
         self.sub_lang_menu.addAction(list_of_subs[-1])
         list_of_subs[-1].triggered.connect(self.on_sub_change)
         for subtitle in tracks:
-            print(subtitle)
+            logger.debug("Track: %s", subtitle)
             if subtitle.type == vlc.TrackType.ext:
                 subtitle_lang = "None"
                 try:
@@ -525,7 +663,7 @@ class Player(QtWidgets.QMainWindow):
             self.sub_lang_menu.addAction(list_of_subs[-1])
             list_of_subs[-1].triggered.connect(self.on_sub_change)
             for subtitle in tracks:
-                print(subtitle)
+                logger.debug("Track: %s", subtitle)
                 if subtitle.type == vlc.TrackType.ext:
                     subtitle_lang = "None"
                     try:
@@ -571,28 +709,25 @@ class Player(QtWidgets.QMainWindow):
         self.timer.start()
 
     def update_ui(self):
-        """Updates the user interface"""
+        """Updates the user interface from the sampled player state"""
+        state = self.state_sampler.state
 
         # Set the slider's position to its corresponding media position
         # Note that the setValue function only takes values of type int,
         # so we must first convert the corresponding media position.
-        media_pos = int(self.mediaplayer.get_position() * 1000)
+        media_pos = int(state.position * 1000)
         self.main_window.positionslider.setValue(media_pos)
 
-        if media_pos >= 0 and self.mediaplayer.is_playing():
-            current_time = self.mediaplayer.get_time()
+        if media_pos >= 0 and state.is_playing:
+            current_time = state.time
             if current_time > self.last_update_time + 5000:
                 if self.main_window.server_input.isChecked():
                     if self.is_connected:
                         self.data_queue.put(current_time)
                 self.last_update_time = current_time
-        else:
-            if self.main_window.server_input.isChecked():
-                if self.is_connected:
-                    self.data_queue.queue.clear()
 
         # No need to call this function if nothing is played
-        if not self.mediaplayer.is_playing():
+        if state.ended:
             self.timer.stop()
 
             # After the video finished, the play button stills shows "Pause",
@@ -606,7 +741,7 @@ class Player(QtWidgets.QMainWindow):
             val = self.data_queue.get_nowait()
         else:
             return
-        print(val)
+        trace(logger, "Applying %s", val)
         if val == '<':
             self.mediaplayer.set_rate(self.mediaplayer.get_rate() * 0.5)
             return
@@ -629,7 +764,7 @@ class Player(QtWidgets.QMainWindow):
 
     def update_time_label(self):
         mtime = QtCore.QTime(0, 0, 0, 0)
-        self.time = mtime.addMSecs(self.mediaplayer.get_time())
+        self.time = mtime.addMSecs(max(self.state_sampler.state.time, 0))
         self.main_window.timelabel.setText(self.time.toString())
 
     def update_pb_rate_label(self):
@@ -639,11 +774,19 @@ class Player(QtWidgets.QMainWindow):
 def main():
     """Entry point for our simple vlc player
     """
+    profiler = None
+    if "--profile-startup" in sys.argv:
+        sys.argv.remove("--profile-startup")
+        profiler = StartupProfiler(STARTUP_T0)
+        profiler.record("import", time.perf_counter() - STARTUP_T0)
+    setup_logging(logging.DEBUG if "--verbose" in sys.argv else logging.INFO)
     app = QtWidgets.QApplication(sys.argv)
-    player = Player()
+    player = Player(profiler=profiler)
     player.main_window.show()
     player.resize(640, 480)
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    shutdown_logging()
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
@@ -26,23 +26,10 @@ import threading
 
 import paho.mqtt.client as mqtt
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-
-logger.setLevel(logging.DEBUG)
-
-# create console handler and set level to debug
-ch = logging.StreamHandler()
-ch.setLevel(logging.DEBUG)
+from eventlog import trace
 
-# create formatter
-formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-
-# add formatter to ch
-ch.setFormatter(formatter)
-
-# add ch to logger
-logger.addHandler(ch)
+# Handlers are set up by the application, see eventlog.setup_logging
+logger = logging.getLogger(__name__)
 
 
 class Server:
@@ -61,7 +48,7 @@ class Server:
         t.start()
 
     def on_connect(self, client, userdata, flags, rc):
-        print("connect: " + str(rc))
+        logger.info("connect: %s", rc)
         self.is_connected = True
 
     def data_sender(self):
@@ -75,6 +62,41 @@ class Server:
         self.client.disconnect()
 
 
+class EmbeddedServer:
+    """Data sender with its own broker
+
+    The broker runs inside this process on `port` and the data is handed to
+    it directly, followers connect to this machine like to any other broker.
+    """
+
+    def __init__(self, client_id, host, port, topic, data_queue):
+        # Imported here so followers don't pay for asyncio at startup
+        from broker import EmbeddedBroker
+
+        self.data_queue = data_queue
+        self.topic = "$" + topic
+        self.broker = EmbeddedBroker(port=port)
+        self.broker.start()
+        self.is_connected = True
+        self.sender = threading.Thread(target=self.data_sender, args=())
+        self.sender.daemon = True
+        self.sender.start()
+
+    def data_sender(self):
+        while True:
+            item = self.data_queue.get()
+            # None is put by disconnect(), don't hang on to the queue of the next connection
+            if item is None or not self.is_connected:
+                return
+            self.broker.publish_threadsafe(self.topic, "{},".format(item).encode())
+
+    def disconnect(self):
+        self.is_connected = False
+        self.data_queue.put(None)
+        self.sender.join(1.0)
+        self.broker.stop()
+
+
 class Client:
     """Data receiver client"""
 
@@ -90,15 +112,14 @@ class Client:
         self.client.loop_start()
 
     def on_connect(self, client, userdata, flags, rc):
-        print("connect: " + str(rc))
+        logger.info("connect: %s", rc)
         self.is_connected = True
 
     def data_receiver(self, client, userdata, message):
         """Handles receiving, parsing, and queueing data"""
 
         data = str(message.payload.decode())
-        print("Received: ")
-        print(data)
+        trace(logger, "Received: %s", data)
         if data:
             for chara in data.split(','):
                 if chara:
@@ -108,7 +129,7 @@ class Client:
                         self.data_queue.put(chara)
 
     def on_subscribe(self, mqttc, obj, mid, granted_qos):
-        print("Subscribed: " + str(mid) + " " + str(granted_qos))
+        logger.info("Subscribed: %s %s", mid, granted_qos)
 
     def disconnect(self):
         self.client.disconnect()
@@ -0,0 +1,183 @@
+#
+# PyQt5-based video-sync example for VLC Python bindings
+# Copyright (C) 2009-2010 the VideoLAN team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+#
+"""
+Event driven sampling of the libVLC media player state.
+
+Instead of asking libVLC for the position, time and playing state on
+every UI tick, the sampler subscribes to the media player events and keeps
+a snapshot that the UI and the sync code can read without any ctypes call.
+
+The libVLC callbacks run on a libVLC thread: listeners must not touch Qt
+widgets and must not call back into libVLC to change the player state.
+"""
+
+import collections
+import threading
+
+PlayerState = collections.namedtuple("PlayerState", "is_playing is_paused ended buffering time position rate")
+
+INITIAL_STATE = PlayerState(is_playing=False, is_paused=False, ended=False, buffering=100.0, time=-1,
+                            position=-1.0, rate=1.0)
+
+# State changes that are passed on to the listeners
+PLAYING = "playing"
+PAUSED = "paused"
+STOPPED = "stopped"
+ENDED = "ended"
+BUFFERING = "buffering"
+
+
+class PlayerStateSampler:
+    """Keeps a cached PlayerState up to date from libVLC events
+
+    `event_types` is the namespace holding the event constants, vlc.EventType
+    when left out.
+    """
+
+    def __init__(self, mediaplayer, event_types=None):
+        if event_types is None:
+            import vlc
+            event_types = vlc.EventType
+        self.mediaplayer = mediaplayer
+        self.state = INITIAL_STATE
+        self.listeners = []
+        self.lock = threading.Lock()
+
+        self.event_manager = mediaplayer.event_manager()
+        self.handlers = {
+            event_types.MediaPlayerPlaying: self.on_playing,
+            event_types.MediaPlayerPaused: self.on_paused,
+            event_types.MediaPlayerStopped: self.on_stopped,
+            event_types.MediaPlayerEndReached: self.on_end_reached,
+            event_types.MediaPlayerBuffering: self.on_buffering,
+            event_types.MediaPlayerTimeChanged: self.on_time_changed,
+            event_types.MediaPlayerPositionChanged: self.on_position_changed,
+        }
+        for event_type, handler in self.handlers.items():
+            self.event_manager.event_attach(event_type, handler)
+
+    def detach(self):
+        for event_type in self.handlers:
+            self.event_manager.event_detach(event_type)
+        self.listeners = []
+
+    def add_listener(self, listener):
+        """Call `listener(change, state)` on every playing/paused/stopped/ended/buffering change"""
+        self.listeners.append(listener)
+
+    def update(self, **changes):
+        with self.lock:
+            self.state = self.state._replace(**changes)
+            return self.state
+
+    def notify(self, change, state):
+        for listener in self.listeners:
+            listener(change, state)
+
+    def rate_changed(self, rate):
+        """Record the rate read or set on the GUI side, libVLC has no event for it"""
+        self.update(rate=rate)
+
+    def on_playing(self, event):
+        self.notify(PLAYING, self.update(is_playing=True, is_paused=False, ended=False))
+
+    def on_paused(self, event):
+        self.notify(PAUSED, self.update(is_playing=False, is_paused=True))
+
+    def on_stopped(self, event):
+        self.notify(STOPPED, self.update(is_playing=False, is_paused=False, time=-1, position=-1.0))
+
+    def on_end_reached(self, event):
+        self.notify(ENDED, self.update(is_playing=False, is_paused=False, ended=True))
+
+    def on_buffering(self, event):
+        cache = event.u.new_cache
+        stalled = cache < 100.0
+        if stalled != (self.state.buffering < 100.0):
+            self.notify(BUFFERING, self.update(buffering=cache))
+        else:
+            self.update(buffering=cache)
+
+    def on_time_changed(self, event):
+        self.update(time=event.u.new_time)
+
+    def on_position_changed(self, event):
+        self.update(position=event.u.new_position)
+
+
+class StateAnnouncer:
+    """Decides which play/pause/stop signals are queued for the followers
+
+    The GUI calls expect() before it asks libVLC for a change and send()
+    afterwards, so it owns the signals it starts, with the current time.
+    The libVLC event of an expected change is skipped, any other change
+    came from outside and is queued straight from the event by on_change().
+
+    `is_active` tells whether this player is a connected leader, it is
+    called from the libVLC event thread and must not touch Qt widgets.
+    """
+
+    SIGNALS = {PLAYING: 'P', PAUSED: 'p', STOPPED: 'S', ENDED: 'S'}
+
+    def __init__(self, data_queue, is_active):
+        self.data_queue = data_queue
+        self.is_active = is_active
+        self.sent = None
+        self.expected = None
+        self.lock = threading.Lock()
+
+    def expect(self, signal):
+        """Mark a change the GUI is about to make, None forgets it again"""
+        with self.lock:
+            self.expected = signal
+
+    def send(self, signal, current_time=None):
+        """Reset the queue and queue `signal` and the position to jump to
+
+        Skipped when `signal` already went out, e.g. the stop after the end
+        of the stream that was sent straight from the EndReached event.
+        """
+        with self.lock:
+            if signal != self.sent:
+                self.queue(signal, current_time)
+
+    def queue(self, signal, current_time):
+        self.sent = signal
+        if self.is_active():
+            self.data_queue.queue.clear()
+            self.data_queue.put('d')
+            self.data_queue.put(signal)
+            if current_time is not None and current_time >= 0:
+                self.data_queue.put(current_time)
+
+    def on_change(self, change, state):
+        """PlayerStateSampler listener, runs on the libVLC event thread"""
+        if change == BUFFERING:
+            # Playback resumes after a stall, resync the followers
+            if state.buffering >= 100.0 and state.time >= 0 and self.is_active():
+                self.data_queue.put(state.time)
+            return
+        signal = self.SIGNALS[change]
+        with self.lock:
+            if signal == self.expected:
+                self.expected = None
+                return
+            if signal == self.sent:
+                return
+            self.queue(signal, state.time if signal == 'P' else None)
@@ -0,0 +1,303 @@
+#
+# PyQt5-based video-sync example for VLC Python bindings
+# Copyright (C) 2009-2010 the VideoLAN team
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+#
+"""
+Headless relay passing the sync stream from one broker on to another.
+
+A relay subscribes to the leader's topic on an upstream broker and
+re-publishes it on a downstream broker, usually one per site, so only the
+relay pulls the stream across the WAN. Relays can be chained into a tree.
+
+While the leader is playing, every media time passing through is moved
+forward by the relay's measured upstream latency, so followers further
+down see the time the leader is at now. The latency is half the smallest
+recent round trip of a probe message sent through the upstream broker.
+
+Play, pause, stop, rate changes and seeks are forwarded right away.
+Heartbeats, the media times the leader sends on its own while playing,
+are coalesced: one is only forwarded every `heartbeat_interval` seconds
+unless it is off from the predicted time by more than `tolerance` ms.
+The player sends a heartbeat every 5 seconds, so the default of 15 seconds
+forwards one in three while the leader plays on as predicted. Heartbeats
+are accepted up to half of their upstream period early, so jitter doesn't
+push the forwarded one to the next period, and a chain of relays keeps
+forwarding one every `heartbeat_interval`.
+
+    python relay.py leader-site:1883 mytopic --listen 1883
+    python relay.py leader-site:1883 mytopic --downstream localhost:1884
+"""
+
+import argparse
+import asyncio
+import collections
+import logging
+import time
+
+from broker import (PINGREQ, PUBLISH, EmbeddedBroker, ProtocolError, decode_string, encode_publish, encode_subscribe,
+                    open_client, packet, read_packet)
+from eventlog import setup_logging, trace
+
+logger = logging.getLogger(__name__)
+
+# Control tokens of the sync protocol, everything else is a media time in ms
+CONTROL_TOKENS = {'d', 'P', 'p', 'S', '<', '>'}
+
+# Seconds between the heartbeats the player sends while playing
+PLAYER_HEARTBEAT = 5.0
+
+
+class Relay:
+    """Re-publishes the sync stream for `topic` from upstream to downstream
+
+    The downstream side is either a broker embedded in the relay, listening
+    on `listen_port`, or an existing broker at `downstream_host`.
+    """
+
+    def __init__(self, client_id, upstream_host, upstream_port, topic, downstream_host=None, downstream_port=1883,
+                 listen_port=None, heartbeat_interval=15.0, tolerance=50, probe_interval=1.0, compensate=True,
+                 keepalive=60):
+        self.client_id = client_id
+        self.upstream = (upstream_host, upstream_port)
+        self.downstream = (downstream_host, downstream_port)
+        self.listen_port = listen_port
+        self.topic = "$" + topic
+        self.probe_topic = "relay/{}/probe".format(client_id)
+        self.heartbeat_interval = heartbeat_interval
+        self.tolerance = tolerance
+        self.probe_interval = probe_interval
+        self.compensate = compensate
+        self.keepalive = keepalive
+
+        self.broker = None
+        self.downstream_writer = None
+        self.upstream_writer = None
+        self.round_trips = collections.deque(maxlen=8)
+        self.latency = 0.0
+
+        # Player state as seen in the stream
+        self.playing = False
+        self.rate = 1.0
+        self.after_control = False
+        self.last_time = None
+        self.last_time_at = 0.0
+        self.last_heartbeat_at = None
+        # Seconds between the heartbeats arriving from upstream, the player's until measured
+        self.heartbeat_period = PLAYER_HEARTBEAT
+        self.coalesced = 0
+
+    def upstream_latency(self):
+        """One way latency from the upstream broker in ms"""
+        return self.latency if self.compensate else 0.0
+
+    def predicted_time(self, now):
+        if self.last_time is None:
+            return None
+        if not self.playing:
+            return self.last_time
+        return self.last_time + (now - self.last_time_at) * 1000 * self.rate
+
+    def relay_message(self, payload, now=None):
+        """Turn one upstream message into the downstream payload, None if it is coalesced"""
+        now = time.monotonic() if now is None else now
+        tokens = [token for token in payload.decode().split(',') if token]
+        forwarded = []
+        heartbeat = True
+        for token in tokens:
+            if token in CONTROL_TOKENS:
+                heartbeat = False
+                self.after_control = True
+                self.last_heartbeat_at = None
+                if token == 'P':
+                    self.playing = True
+                elif token in ('p', 'S'):
+                    self.playing = False
+                elif token == '<':
+                    self.rate *= 0.5
+                elif token == '>':
+                    self.rate *= 2
+                forwarded.append(token)
+                continue
+            try:
+                media_time = int(token)
+            except ValueError:
+                logger.warning("Unknown token %r in the sync stream", token)
+                continue
+            if self.playing:
+                media_time += int(round(self.upstream_latency() * self.rate))
+            if self.after_control:
+                # Part of a seek or a play/pause, never coalesced
+                heartbeat = False
+                self.after_control = False
+            elif heartbeat:
+                if self.last_heartbeat_at is not None:
+                    self.heartbeat_period = now - self.last_heartbeat_at
+                self.last_heartbeat_at = now
+                if self.last_time is not None:
+                    predicted = self.predicted_time(now)
+                    due = self.heartbeat_interval - self.heartbeat_period / 2
+                    if now - self.last_time_at < due and abs(media_time - predicted) <= self.tolerance:
+                        self.coalesced += 1
+                        continue
+            self.last_time = media_time
+            self.last_time_at = now
+            forwarded.append(str(media_time))
+        if not forwarded:
+            return None
+        return "{},".format(",".join(forwarded)).encode()
+
+    def publish(self, payload):
+        if self.broker is not None:
+            self.broker.publish(self.topic, payload)
+        elif self.downstream_writer is not None:
+            self.downstream_writer.write(encode_publish(self.topic, payload))
+
+    def on_probe(self, payload):
+        self.round_trips.append(time.monotonic_ns() - int(payload))
+        # The smallest recent round trip is the one least disturbed by queueing
+        self.latency = min(self.round_trips) / 2e6
+
+    async def send_probes(self):
+        while True:
+            self.upstream_writer.write(encode_publish(self.probe_topic, str(time.monotonic_ns()).encode()))
+            await asyncio.sleep(self.probe_interval)
+
+    async def send_pings(self, writer):
+        while True:
+            await asyncio.sleep(self.keepalive / 2)
+            writer.write(packet(PINGREQ, b""))
+
+    async def read_packet(self, reader):
+        """Read one packet, a connection quiet for longer than the keepalive is taken as lost"""
+        return await asyncio.wait_for(read_packet(reader), self.keepalive * 1.5)
+
+    async def connect_downstream(self):
+        reader, self.downstream_writer = await open_client(*self.downstream, self.client_id + "-down",
+                                                           self.keepalive)
+        logger.info("Publishing to %s:%d", *self.downstream)
+        return reader
+
+    async def run_downstream(self, reader):
+        """Keep the downstream connection alive, returns when it is lost"""
+        pings = asyncio.ensure_future(self.send_pings(self.downstream_writer))
+        try:
+            # Read past whatever the downstream broker sends, e.g. PINGRESP
+            while True:
+                await self.read_packet(reader)
+        finally:
+            pings.cancel()
+            self.downstream_writer.close()
+            self.downstream_writer = None
+
+    def on_publish(self, body):
+        topic, offset = decode_string(body, 0)
+        payload = bytes(body[offset:])
+        try:
+            if topic == self.probe_topic.encode():
+                self.on_probe(payload)
+                return
+            trace(logger, "Relaying %s", payload)
+            relayed = self.relay_message(payload)
+        except ValueError:
+            logger.warning("Dropping malformed message %r on %r", payload, topic)
+            return
+        if relayed is not None:
+            self.publish(relayed)
+
+    async def run_upstream(self):
+        """Relay from the upstream broker, returns when the connection is lost"""
+        reader, self.upstream_writer = await open_client(*self.upstream, self.client_id, self.keepalive)
+        self.upstream_writer.write(encode_subscribe(self.topic + "/#", 1))
+        self.upstream_writer.write(encode_subscribe(self.probe_topic, 2))
+        logger.info("Relaying %s from %s:%d", self.topic, *self.upstream)
+        tasks = [asyncio.ensure_future(self.send_probes()),
+                 asyncio.ensure_future(self.send_pings(self.upstream_writer))]
+        try:
+            while True:
+                packet_type, flags, body = await self.read_packet(reader)
+                if packet_type == PUBLISH:
+                    self.on_publish(body)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.upstream_writer.close()
+
+    async def run_connections(self):
+        """Run the upstream and, without an embedded broker, the downstream connection until one is lost"""
+        tasks = []
+        if self.broker is None:
+            # Connected first so nothing is relayed before there is somewhere to publish to
+            tasks.append(asyncio.ensure_future(self.run_downstream(await self.connect_downstream())))
+        tasks.append(asyncio.ensure_future(self.run_upstream()))
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self, retry_interval=2.0):
+        """Relay until cancelled, reconnecting when the upstream or downstream broker goes away"""
+        if self.listen_port is not None:
+            self.broker = EmbeddedBroker(port=self.listen_port)
+            await self.broker.serve()
+        try:
+            while True:
+                try:
+                    await self.run_connections()
+                except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ProtocolError) as error:
+                    logger.warning("Connection lost: %s", str(error) or type(error).__name__)
+                await asyncio.sleep(retry_interval)
+        finally:
+            if self.broker is not None:
+                await self.broker.close()
+
+
+def split_address(address, default_port=1883):
+    host, _, port = address.partition(":")
+    return host, int(port) if port else default_port
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("upstream", help="host[:port] of the upstream broker")
+    parser.add_argument("topic", help="topic the leader publishes on, as entered in the player")
+    downstream = parser.add_mutually_exclusive_group(required=True)
+    downstream.add_argument("--listen", type=int, metavar="PORT", help="run an embedded broker for the followers")
+    downstream.add_argument("--downstream", metavar="HOST[:PORT]", help="publish to an existing broker")
+    parser.add_argument("--id", default="relay-{}".format(int(time.time())), help="MQTT client id")
+    parser.add_argument("--heartbeat-interval", type=float, default=15.0,
+                        help="seconds between forwarded heartbeats, the player sends one every 5")
+    parser.add_argument("--no-compensation", action="store_true", help="don't add the upstream latency")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    setup_logging(logging.DEBUG if args.verbose else logging.INFO)
+    downstream_host, downstream_port = split_address(args.downstream) if args.downstream else (None, None)
+    relay = Relay(args.id, *split_address(args.upstream), args.topic, downstream_host, downstream_port,
+                  listen_port=args.listen, heartbeat_interval=args.heartbeat_interval,
+                  compensate=not args.no_compensation)
+    try:
+        asyncio.run(relay.run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
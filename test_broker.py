@@ -0,0 +1,222 @@
+"""
+Checks for the embedded broker.
+
+    python -m pytest -q
+"""
+
+import importlib.util
+import logging
+import socket
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+from broker import (CONNACK, CONNECT, PUBLISH, SUBACK, SUBSCRIBE, EmbeddedBroker, decode_string, encode_publish,
+                    encode_string, encode_subscribe, packet)
+
+
+def connect_body(client_id="test"):
+    return encode_string("MQTT") + bytes([4, 0x02]) + (60).to_bytes(2, "big") + encode_string(client_id)
+
+
+def recv_exactly(sock, length):
+    data = b""
+    while len(data) < length:
+        chunk = sock.recv(length - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        data += chunk
+    return data
+
+
+def recv_packet(sock):
+    """Blocking read_packet for a plain socket, returns (packet type, flags, body)"""
+    header = recv_exactly(sock, 1)[0]
+    length = 0
+    for shift in range(0, 28, 7):
+        byte = recv_exactly(sock, 1)[0]
+        length |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            break
+    return header >> 4, header & 0x0F, recv_exactly(sock, length)
+
+
+def recv_publish(sock):
+    """(topic, payload, retain) of the next PUBLISH"""
+    while True:
+        packet_type, flags, body = recv_packet(sock)
+        if packet_type == PUBLISH:
+            topic, offset = decode_string(body, 0)
+            return topic.decode(), body[offset:], bool(flags & 0x01)
+
+
+class BrokerTestCase(unittest.TestCase):
+
+    queue_size = 256
+
+    def setUp(self):
+        self.broker = EmbeddedBroker("127.0.0.1", 0, queue_size=self.queue_size)
+        self.broker.start()
+        self.sockets = []
+
+    def tearDown(self):
+        self.broker.stop()
+        for sock in self.sockets:
+            sock.close()
+
+    def open(self, data):
+        sock = socket.create_connection(("127.0.0.1", self.broker.port), timeout=5)
+        self.sockets.append(sock)
+        sock.sendall(data)
+        return sock
+
+    def connect(self, client_id, receive_buffer=None):
+        sock = socket.socket()
+        self.sockets.append(sock)
+        if receive_buffer:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+        sock.settimeout(5)
+        sock.connect(("127.0.0.1", self.broker.port))
+        sock.sendall(packet(CONNECT, connect_body(client_id)))
+        self.assertEqual(recv_packet(sock)[0], CONNACK)
+        return sock
+
+    def subscribe(self, sock, topic_filter):
+        sock.sendall(encode_subscribe(topic_filter))
+        self.assertEqual(recv_packet(sock)[0], SUBACK)
+
+    def assert_nothing_received(self, sock):
+        sock.settimeout(0.2)
+        with self.assertRaises(socket.timeout):
+            sock.recv(1)
+        sock.settimeout(5)
+
+    def read_all(self, sock):
+        received = b""
+        while True:
+            data = sock.recv(4096)
+            if not data:
+                return received
+            received += data
+
+    def assert_dropped(self, data):
+        with self.assertLogs("broker", logging.WARNING):
+            sock = self.open(data)
+            self.read_all(sock)
+
+
+
+class EmbeddedBrokerTest(BrokerTestCase):
+
+    def test_short_connect_is_dropped(self):
+        self.assert_dropped(packet(CONNECT, encode_string("MQTT")))
+        self.assert_dropped(packet(CONNECT, encode_string("MQTT") + b"\x04"))
+
+    def test_short_publish_and_subscribe_are_dropped(self):
+        connect = packet(CONNECT, connect_body())
+        self.assert_dropped(connect + packet(PUBLISH, encode_string("a"), 0x02))
+        self.assert_dropped(connect + packet(SUBSCRIBE, b"\x00", 0x02))
+        self.assert_dropped(connect + packet(PUBLISH, encode_string(b"\xff\xfe")))
+
+    def test_stop_ends_every_session(self):
+        for index in range(3):
+            sock = self.open(packet(CONNECT, connect_body("client-{}".format(index))))
+            self.assertEqual(sock.recv(4)[0] >> 4, CONNACK)
+        sessions = list(self.broker.connections)
+        self.assertEqual(len(sessions), 3)
+        with self.assertNoLogs("asyncio", logging.ERROR):
+            self.broker.stop()
+        self.assertTrue(all(session.task.done() for session in sessions))
+        self.assertFalse(self.broker.connections)
+
+
+    def test_publish_reaches_matching_subscribers(self):
+        everything = self.connect("everything")
+        self.subscribe(everything, "$sync/#")
+        single = self.connect("single")
+        self.subscribe(single, "$sync/+")
+        other = self.connect("other")
+        self.subscribe(other, "$other/#")
+        leader = self.connect("leader")
+
+        leader.sendall(encode_publish("$sync", b"d,") + encode_publish("$sync/a", b"P,"))
+        self.assertEqual(recv_publish(everything), ("$sync", b"d,", False))
+        self.assertEqual(recv_publish(everything), ("$sync/a", b"P,", False))
+        self.assertEqual(recv_publish(single), ("$sync/a", b"P,", False))
+        self.assert_nothing_received(other)
+
+    def test_wildcards_do_not_match_dollar_topics(self):
+        hash_sock = self.connect("hash")
+        self.subscribe(hash_sock, "#")
+        plus = self.connect("plus")
+        self.subscribe(plus, "+/a")
+        leader = self.connect("leader")
+        leader.sendall(encode_publish("$sync/a", b"d,") + encode_publish("plain/a", b"P,"))
+        self.assertEqual(recv_publish(hash_sock), ("plain/a", b"P,", False))
+        self.assertEqual(recv_publish(plus), ("plain/a", b"P,", False))
+
+    def test_retained_messages(self):
+        leader = self.connect("leader")
+        leader.sendall(encode_publish("$sync", b"1000,", retain=True) + encode_publish("$sync", b"2000,", retain=True))
+        late = self.connect("late")
+        # A round trip through the broker so both publishes were handled
+        self.subscribe(leader, "unused")
+        self.subscribe(late, "$sync/#")
+        self.assertEqual(recv_publish(late), ("$sync", b"2000,", True))
+
+        # An empty retained publish clears it
+        leader.sendall(encode_publish("$sync", b"", retain=True))
+        self.assertEqual(recv_publish(late), ("$sync", b"", False))
+        later = self.connect("later")
+        self.subscribe(later, "$sync/#")
+        self.assert_nothing_received(later)
+
+    @unittest.skipUnless(importlib.util.find_spec("paho"), "paho-mqtt is not installed")
+    def test_followers_do_not_import_the_broker(self):
+        subprocess.run([sys.executable, "-c", "import networkmqtt, sys; assert 'broker' not in sys.modules"],
+                       check=True)
+
+
+class SlowClientTest(BrokerTestCase):
+    """A client that doesn't read loses its oldest messages, the others get everything"""
+
+    queue_size = 8
+
+    def test_slow_client_drops_the_oldest(self):
+        count = 400
+        filler = bytes(32 * 1024)
+        slow = self.connect("slow", receive_buffer=4096)
+        self.subscribe(slow, "$sync/#")
+        fast = self.connect("fast")
+        self.subscribe(fast, "$sync/#")
+
+        fast_received = []
+
+        def read_fast():
+            while len(fast_received) < count:
+                fast_received.append(int(recv_publish(fast)[1].split(b",")[0]))
+
+        reader = threading.Thread(target=read_fast)
+        reader.start()
+        with self.assertLogs("broker", logging.WARNING):
+            for index in range(count):
+                self.broker.publish_threadsafe("$sync", "{},".format(index).encode() + filler)
+                # Paced by the fast client, so only the slow one falls behind
+                while len(fast_received) <= index and reader.is_alive():
+                    time.sleep(0.0005)
+            reader.join(10)
+        self.assertEqual(fast_received, list(range(count)))
+
+        slow_received = []
+        while not slow_received or slow_received[-1] != count - 1:
+            slow_received.append(int(recv_publish(slow)[1].split(b",")[0]))
+        self.assertLess(len(slow_received), count)
+        self.assertEqual(slow_received, sorted(slow_received))
+        # What is left in the queue is the newest messages
+        self.assertEqual(slow_received[-self.queue_size:], list(range(count - self.queue_size, count)))
+
+
+if __name__ == "__main__":
+    unittest.main()
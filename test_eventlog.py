@@ -0,0 +1,119 @@
+"""
+Checks for the rate limit, the flight recorder and trace().
+
+    python -m pytest -q
+"""
+
+import io
+import logging
+import unittest
+from unittest import mock
+
+import eventlog
+from eventlog import FlightRecorder, RateLimitFilter, trace
+
+
+def make_record(msg="Received %s", level=logging.DEBUG, name="test"):
+    return logging.makeLogRecord({"name": name, "msg": msg, "args": ("x",), "levelno": level,
+                                  "levelname": logging.getLevelName(level)})
+
+
+class RateLimitFilterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        patcher = mock.patch("eventlog.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.limit = RateLimitFilter(burst=3, interval=1.0, sample_every=5)
+
+    def passed(self, count, **kwargs):
+        return [self.limit.filter(make_record(**kwargs)) for _ in range(count)]
+
+    def test_burst_then_sampling(self):
+        passed = self.passed(13)
+        self.assertEqual(passed, [True] * 3 + [False] * 4 + [True] + [False] * 4 + [True])
+
+    def test_events_are_limited_separately(self):
+        self.passed(10)
+        self.assertTrue(self.limit.filter(make_record("Sent %s")))
+        self.assertTrue(self.limit.filter(make_record(name="other")))
+
+    def test_warnings_always_pass(self):
+        self.assertEqual(self.passed(50, level=logging.WARNING), [True] * 50)
+        self.assertEqual(self.passed(50, level=logging.ERROR), [True] * 50)
+
+    def test_new_window_reports_the_suppressed_count(self):
+        self.passed(10, level=logging.INFO)
+        self.now += 1.0
+        with self.assertLogs("test", logging.INFO) as logs:
+            self.assertTrue(self.limit.filter(make_record(level=logging.INFO)))
+        self.assertEqual(logs.output, ["INFO:test:6 similar messages suppressed: Received %s"])
+
+    def test_flush_reports_a_flood_that_stopped(self):
+        self.passed(10, level=logging.INFO)
+        with self.assertNoLogs("test", logging.DEBUG):
+            self.limit.flush()
+        self.now += 1.0
+        with self.assertLogs("test", logging.INFO) as logs:
+            self.limit.flush()
+        self.assertEqual(logs.output, ["INFO:test:6 similar messages suppressed: Received %s"])
+        self.assertFalse(self.limit.events)
+
+    def test_forced_flush_reports_open_windows(self):
+        self.passed(4, level=logging.INFO)
+        with self.assertLogs("test", logging.INFO) as logs:
+            self.limit.flush(force=True)
+        self.assertEqual(logs.output, ["INFO:test:1 similar messages suppressed: Received %s"])
+
+
+class FlightRecorderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.recorder = FlightRecorder(capacity=3)
+        patcher = mock.patch("eventlog._recorder", self.recorder)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.logger = logging.getLogger("test.recorder")
+        self.logger.setLevel(logging.INFO)
+        self.addCleanup(self.logger.setLevel, logging.NOTSET)
+
+    def dump(self):
+        stream = io.StringIO()
+        self.recorder.dump(stream)
+        return stream.getvalue().splitlines()
+
+    def test_keeps_the_last_events(self):
+        for index in range(5):
+            self.recorder.add("test", "INFO", "event %d", (index,))
+        lines = self.dump()
+        self.assertEqual(lines[0], "---- flight recorder: last 3 events ----")
+        self.assertEqual([line.split(" - ", 1)[1] for line in lines[1:4]],
+                         ["test - INFO - event {}".format(index) for index in (2, 3, 4)])
+        self.assertEqual(lines[-1], "---- end of flight recorder ----")
+
+    def test_records_exceptions(self):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            self.recorder.handle(self.logger.makeRecord("test", logging.ERROR, __file__, 1, "failed", (),
+                                                        eventlog.sys.exc_info()))
+        output = "\n".join(self.dump())
+        self.assertIn("test - ERROR - failed", output)
+        self.assertIn("ValueError: boom", output)
+
+    def test_trace_records_without_debug(self):
+        with mock.patch.object(self.logger, "debug") as debug:
+            trace(self.logger, "Received %s", "7,")
+        debug.assert_not_called()
+        self.assertIn("test.recorder - DEBUG - Received 7,", self.dump()[1])
+
+    def test_trace_logs_with_debug(self):
+        self.logger.setLevel(logging.DEBUG)
+        with self.assertLogs("test.recorder", logging.DEBUG) as logs:
+            trace(self.logger, "Received %s", "7,")
+        self.assertEqual(logs.output, ["DEBUG:test.recorder:Received 7,"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+Checks for the libVLC state sampler and the signals the leader sends.
+
+    python -m pytest -q
+"""
+
+import queue
+import unittest
+
+from fakeplayer import FakeEventType, FakeMediaPlayer
+from playerstate import BUFFERING, PlayerStateSampler, StateAnnouncer
+
+
+class PlayerStateSamplerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.player = FakeMediaPlayer(length=10000)
+        self.sampler = PlayerStateSampler(self.player, FakeEventType)
+        self.changes = []
+        self.sampler.add_listener(lambda change, state: self.changes.append((change, state)))
+
+    def test_transitions(self):
+        self.player.play()
+        self.assertTrue(self.sampler.state.is_playing)
+        self.player.pause()
+        self.assertTrue(self.sampler.state.is_paused)
+        self.assertFalse(self.sampler.state.is_playing)
+        self.player.play()
+        self.assertFalse(self.sampler.state.is_paused)
+        self.player.end()
+        self.assertTrue(self.sampler.state.ended)
+        self.assertFalse(self.sampler.state.is_playing)
+        self.player.play()
+        self.assertFalse(self.sampler.state.ended)
+        self.player.stop()
+        self.assertEqual(self.sampler.state.time, -1)
+        self.assertEqual([change for change, state in self.changes],
+                         ["playing", "paused", "playing", "ended", "playing", "stopped"])
+
+    def test_time_and_position(self):
+        self.player.play()
+        self.player.tick()
+        self.assertGreaterEqual(self.sampler.state.time, 0)
+        self.assertAlmostEqual(self.sampler.state.position, self.sampler.state.time / 10000)
+
+    def test_playing_does_not_call_back_into_libvlc(self):
+        self.player.play()
+        self.player.pause()
+        self.player.play()
+        self.assertEqual(self.player.calls["get_rate"], 0)
+
+    def test_rate(self):
+        self.sampler.rate_changed(2.0)
+        self.player.play()
+        self.assertEqual(self.sampler.state.rate, 2.0)
+
+    def test_buffering_notifies_on_stall_and_recovery_only(self):
+        for cache in (100.0, 40.0, 60.0, 100.0, 100.0):
+            self.player.events.fire(FakeEventType.MediaPlayerBuffering, new_cache=cache)
+        self.assertEqual([(change, state.buffering) for change, state in self.changes],
+                         [(BUFFERING, 40.0), (BUFFERING, 100.0)])
+
+
+class StateAnnouncerTest(unittest.TestCase):
+    """Drives the announcer the way Player does, the fake fires its events synchronously"""
+
+    def setUp(self):
+        self.player = FakeMediaPlayer(length=10000)
+        self.sampler = PlayerStateSampler(self.player, FakeEventType)
+        self.data_queue = queue.Queue()
+        self.active = True
+        self.announcer = StateAnnouncer(self.data_queue, lambda: self.active)
+        self.sampler.add_listener(self.announcer.on_change)
+
+    def sent(self):
+        items = []
+        while not self.data_queue.empty():
+            items.append(self.data_queue.get_nowait())
+        return items
+
+    def gui_play(self):
+        self.announcer.expect('P')
+        self.player.play()
+        self.announcer.send('P', self.player.get_time())
+
+    def gui_pause(self):
+        self.announcer.expect('p')
+        self.player.pause()
+        self.announcer.send('p')
+
+    def test_gui_play_is_sent_once_with_the_current_time(self):
+        self.player.paused_time = 1234
+        self.gui_play()
+        items = self.sent()
+        self.assertEqual(items[:2], ['d', 'P'])
+        self.assertEqual(len(items), 3)
+        self.assertGreaterEqual(items[2], 1234)
+
+    def test_gui_pause_is_not_doubled(self):
+        self.gui_play()
+        self.sent()
+        self.gui_pause()
+        self.assertEqual(self.sent(), ['d', 'p'])
+
+    def test_outside_changes_are_sent(self):
+        self.gui_play()
+        self.sent()
+        self.player.pause()
+        self.assertEqual(self.sent(), ['d', 'p'])
+        self.player.play()
+        self.player.tick()
+        items = self.sent()
+        self.assertEqual(items[:2], ['d', 'P'])
+
+    def test_end_of_stream_stops_the_followers(self):
+        self.gui_play()
+        self.sent()
+        self.player.end()
+        self.assertEqual(self.sent(), ['d', 'S'])
+        # update_ui stops the player afterwards, like Player.stop() does
+        self.announcer.expect('S')
+        self.player.stop()
+        self.announcer.send('S')
+        self.assertEqual(self.sent(), [])
+
+    def test_gui_stop_is_sent_once(self):
+        self.gui_play()
+        self.sent()
+        self.announcer.expect('S')
+        self.player.stop()
+        self.announcer.send('S')
+        self.assertEqual(self.sent(), ['d', 'S'])
+
+    def test_replay_after_end(self):
+        self.gui_play()
+        self.player.end()
+        self.sent()
+        self.gui_play()
+        self.assertEqual(self.sent()[:2], ['d', 'P'])
+
+    def test_buffering_recovery_resyncs(self):
+        self.gui_play()
+        self.player.tick()
+        self.sent()
+        self.player.events.fire(FakeEventType.MediaPlayerBuffering, new_cache=20.0)
+        self.assertEqual(self.sent(), [])
+        self.player.events.fire(FakeEventType.MediaPlayerBuffering, new_cache=100.0)
+        self.assertEqual(self.sent(), [self.sampler.state.time])
+
+    def test_nothing_is_queued_when_not_leading(self):
+        self.active = False
+        self.gui_play()
+        self.player.pause()
+        self.player.end()
+        self.assertEqual(self.sent(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
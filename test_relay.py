@@ -0,0 +1,158 @@
+"""
+Checks for the relay.
+
+    python -m pytest -q
+"""
+
+import asyncio
+import logging
+import random
+import unittest
+
+from broker import PUBLISH, EmbeddedBroker, decode_string, encode_string, encode_subscribe, open_client, read_packet
+from relay import Relay
+
+TOPIC = "test"
+
+
+def make_relays(depth):
+    return [Relay("relay-{}".format(level), "127.0.0.1", 1883, TOPIC, listen_port=0, compensate=False)
+            for level in range(depth)]
+
+
+class RelayMessageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.relay = Relay("relay", "127.0.0.1", 1883, TOPIC, listen_port=0, compensate=False)
+        self.published = []
+        self.relay.publish = self.published.append
+
+    def test_control_tokens_and_seeks_are_forwarded(self):
+        self.assertEqual(self.relay.relay_message(b"d,", now=0.0), b"d,")
+        self.assertEqual(self.relay.relay_message(b"P,", now=0.0), b"P,")
+        self.assertEqual(self.relay.relay_message(b"1000,", now=0.0), b"1000,")
+
+    def test_heartbeats_are_coalesced(self):
+        for payload in (b"d,", b"P,", b"1000,"):
+            self.relay.relay_message(payload, now=0.0)
+        # The player's 5 second heartbeats, on time
+        self.assertIsNone(self.relay.relay_message(b"6000,", now=5.0))
+        self.assertIsNone(self.relay.relay_message(b"11000,", now=10.0))
+        self.assertEqual(self.relay.relay_message(b"16000,", now=15.0), b"16000,")
+        # Off by more than the tolerance
+        self.assertEqual(self.relay.relay_message(b"21500,", now=20.0), b"21500,")
+        self.assertEqual(self.relay.coalesced, 2)
+
+    def forwarded_heartbeats(self, relays, seed, duration=300, jitter=0.005, seek_every=None):
+        """Arrival times of the player's 5 second heartbeats after the last relay, with jitter on every hop
+
+        Every `seek_every` seconds the leader seeks to where it already is,
+        a 'd' and the media time.
+        """
+        rng = random.Random(seed)
+
+        def send(payloads, now):
+            for relay in relays:
+                now += rng.uniform(-jitter, jitter)
+                payloads = [relayed for relayed in (relay.relay_message(payload, now=now) for payload in payloads)
+                            if relayed is not None]
+            return now if payloads else None
+
+        send([b"d,", b"P,", b"0,"], 0.0)
+        forwarded = []
+        for sent_at in range(5, duration, 5):
+            payloads = ["{},".format(sent_at * 1000).encode()]
+            if seek_every and sent_at % seek_every == 0:
+                payloads.insert(0, b"d,")
+            arrived_at = send(payloads, sent_at)
+            if arrived_at is not None:
+                forwarded.append(arrived_at)
+        return forwarded
+
+    def assert_forwarded_every_interval(self, forwarded):
+        gaps = [later - earlier for earlier, later in zip(forwarded, forwarded[1:])]
+        self.assertTrue(gaps)
+        for gap in gaps:
+            self.assertAlmostEqual(gap, 15.0, delta=0.1)
+
+    def test_jittered_heartbeats_are_forwarded_every_interval(self):
+        for seed in range(20):
+            self.assert_forwarded_every_interval(self.forwarded_heartbeats(make_relays(1), seed))
+
+    def test_chained_relays_keep_the_interval(self):
+        for depth in (2, 3):
+            for seed in range(20):
+                self.assert_forwarded_every_interval(self.forwarded_heartbeats(make_relays(depth), seed))
+
+    def test_chained_relays_forward_after_a_seek(self):
+        for seed in range(20):
+            forwarded = self.forwarded_heartbeats(make_relays(3), seed, seek_every=20)
+            gaps = [later - earlier for earlier, later in zip(forwarded, forwarded[1:])]
+            self.assertAlmostEqual(max(gaps), 15.0, delta=0.1)
+            self.assertAlmostEqual(min(gaps), 5.0, delta=0.1)
+
+    def test_malformed_messages_are_dropped(self):
+        with self.assertLogs("relay", logging.WARNING):
+            self.relay.on_publish(encode_string(self.relay.probe_topic) + b"not a time")
+        with self.assertLogs("relay", logging.WARNING):
+            self.relay.on_publish(encode_string(self.relay.topic) + b"\xff\xfe,")
+        self.relay.on_publish(encode_string(self.relay.topic) + b"d,")
+        self.assertEqual(self.published, [b"d,"])
+
+
+class RelayConnectionTest(unittest.TestCase):
+
+    def test_quiet_connection_times_out(self):
+        async def run():
+            relay = Relay("relay", "127.0.0.1", 1883, TOPIC, keepalive=0.05)
+            with self.assertRaises(asyncio.TimeoutError):
+                await relay.read_packet(asyncio.StreamReader())
+
+        asyncio.run(run())
+
+    def test_reconnects_to_the_downstream_broker(self):
+        async def receive(port):
+            reader, writer = await open_client("127.0.0.1", port, "follower")
+            writer.write(encode_subscribe("$" + TOPIC + "/#"))
+            await read_packet(reader)
+            return reader, writer
+
+        async def next_publish(reader):
+            while True:
+                packet_type, flags, body = await asyncio.wait_for(read_packet(reader), 5)
+                if packet_type == PUBLISH:
+                    topic, offset = decode_string(body, 0)
+                    return bytes(body[offset:])
+
+        async def run():
+            upstream = EmbeddedBroker("127.0.0.1", 0)
+            await upstream.serve()
+            downstream = EmbeddedBroker("127.0.0.1", 0)
+            await downstream.serve()
+            port = downstream.port
+            relay = Relay("relay", "127.0.0.1", upstream.port, TOPIC, "127.0.0.1", port)
+            task = asyncio.ensure_future(relay.run(retry_interval=0.05))
+            try:
+                for attempt in range(2):
+                    reader, writer = await receive(port)
+                    while len(upstream.sessions) < 1 or len(downstream.sessions) < 2:
+                        await asyncio.sleep(0.01)
+                    upstream.publish("$" + TOPIC, b"S,")
+                    self.assertEqual(await next_publish(reader), b"S,")
+                    writer.close()
+                    # The downstream broker goes away and comes back on the same port
+                    await downstream.close()
+                    downstream = EmbeddedBroker("127.0.0.1", port)
+                    await downstream.serve()
+            finally:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await upstream.close()
+                await downstream.close()
+
+        with self.assertLogs("relay", logging.WARNING):
+            asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+
+################################################################################
+## Form generated from reading UI file 'videosync.ui'
+##
+## Created by: Qt User Interface Compiler version 5.15.2
+##
+## WARNING! All changes made in this file will be lost when recompiling UI file!
+################################################################################
+
+from PySide2.QtCore import *
+from PySide2.QtGui import *
+from PySide2.QtWidgets import *
+
+
+class Ui_MainWindow(object):
+    def setupUi(self, MainWindow):
+        if not MainWindow.objectName():
+            MainWindow.setObjectName(u"MainWindow")
+        MainWindow.resize(642, 479)
+        sizePolicy = QSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.MinimumExpanding)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(MainWindow.sizePolicy().hasHeightForWidth())
+        MainWindow.setSizePolicy(sizePolicy)
+        self.centralwidget = QWidget(MainWindow)
+        self.centralwidget.setObjectName(u"centralwidget")
+        self.centralwidget.setEnabled(True)
+        sizePolicy.setHeightForWidth(self.centralwidget.sizePolicy().hasHeightForWidth())
+        self.centralwidget.setSizePolicy(sizePolicy)
+        self.centralwidget.setAutoFillBackground(True)
+        self.verticalLayoutWidget = QWidget(self.centralwidget)
+        self.verticalLayoutWidget.setObjectName(u"verticalLayoutWidget")
+        self.verticalLayoutWidget.setGeometry(QRect(0, 0, 641, 431))
+        self.vboxlayout = QVBoxLayout(self.verticalLayoutWidget)
+        self.vboxlayout.setObjectName(u"vboxlayout")
+        self.vboxlayout.setSizeConstraint(QLayout.SetDefaultConstraint)
+        self.vboxlayout.setContentsMargins(0, 0, 0, 0)
+        self.videoframe = QFrame(self.verticalLayoutWidget)
+        self.videoframe.setObjectName(u"videoframe")
+        self.videoframe.setAutoFillBackground(True)
+        self.videoframe.setFrameShape(QFrame.StyledPanel)
+        self.videoframe.setFrameShadow(QFrame.Raised)
+
+        self.vboxlayout.addWidget(self.videoframe)
+
+        self.top_control_box = QWidget(self.verticalLayoutWidget)
+        self.top_control_box.setObjectName(u"top_control_box")
+        self.top_layout_box = QHBoxLayout(self.top_control_box)
+        self.top_layout_box.setObjectName(u"top_layout_box")
+        self.timelabel = QLabel(self.top_control_box)
+        self.timelabel.setObjectName(u"timelabel")
+        sizePolicy1 = QSizePolicy(QSizePolicy.Preferred, QSizePolicy.Preferred)
+        sizePolicy1.setHorizontalStretch(0)
+        sizePolicy1.setVerticalStretch(0)
+        sizePolicy1.setHeightForWidth(self.timelabel.sizePolicy().hasHeightForWidth())
+        self.timelabel.setSizePolicy(sizePolicy1)
+
+        self.top_layout_box.addWidget(self.timelabel)
+
+        self.positionslider = QSlider(self.top_control_box)
+        self.positionslider.setObjectName(u"positionslider")
+        self.positionslider.setMaximum(1000)
+        self.positionslider.setOrientation(Qt.Horizontal)
+
+        self.top_layout_box.addWidget(self.positionslider)
+
+
+        self.vboxlayout.addWidget(self.top_control_box)
+
+        self.bottom_control_box = QWidget(self.verticalLayoutWidget)
+        self.bottom_control_box.setObjectName(u"bottom_control_box")
+        self.bottom_layout_box = QHBoxLayout(self.bottom_control_box)
+        self.bottom_layout_box.setObjectName(u"bottom_layout_box")
+        self.bottom_layout_box.setContentsMargins(-1, -1, 1, -1)
+        self.previousframe = QPushButton(self.bottom_control_box)
+        self.previousframe.setObjectName(u"previousframe")
+        sizePolicy2 = QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        sizePolicy2.setHorizontalStretch(0)
+        sizePolicy2.setVerticalStretch(0)
+        sizePolicy2.setHeightForWidth(self.previousframe.sizePolicy().hasHeightForWidth())
+        self.previousframe.setSizePolicy(sizePolicy2)
+        self.previousframe.setMaximumSize(QSize(40, 40))
+        icon = QIcon()
+        iconThemeName = u"SP_MediaSkipBackward"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon = QIcon.fromTheme(iconThemeName)
+        else:
+            icon.addFile(u".", QSize(), QIcon.Normal, QIcon.Off)
+
+        self.previousframe.setIcon(icon)
+
+        self.bottom_layout_box.addWidget(self.previousframe)
+
+        self.playbutton = QPushButton(self.bottom_control_box)
+        self.playbutton.setObjectName(u"playbutton")
+        sizePolicy2.setHeightForWidth(self.playbutton.sizePolicy().hasHeightForWidth())
+        self.playbutton.setSizePolicy(sizePolicy2)
+        self.playbutton.setMaximumSize(QSize(40, 40))
+        icon1 = QIcon()
+        iconThemeName = u"SP_MediaPlay"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon1 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon1.addFile(u".", QSize(), QIcon.Normal, QIcon.Off)
+
+        self.playbutton.setIcon(icon1)
+
+        self.bottom_layout_box.addWidget(self.playbutton)
+
+        self.nextframe = QPushButton(self.bottom_control_box)
+        self.nextframe.setObjectName(u"nextframe")
+        sizePolicy2.setHeightForWidth(self.nextframe.sizePolicy().hasHeightForWidth())
+        self.nextframe.setSizePolicy(sizePolicy2)
+        self.nextframe.setMaximumSize(QSize(40, 40))
+        icon2 = QIcon()
+        iconThemeName = u"SP_MediaSkipForward"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon2 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon2.addFile(u".", QSize(), QIcon.Normal, QIcon.Off)
+
+        self.nextframe.setIcon(icon2)
+
+        self.bottom_layout_box.addWidget(self.nextframe)
+
+        self.maximize = QPushButton(self.bottom_control_box)
+        self.maximize.setObjectName(u"maximize")
+        sizePolicy2.setHeightForWidth(self.maximize.sizePolicy().hasHeightForWidth())
+        self.maximize.setSizePolicy(sizePolicy2)
+        self.maximize.setMaximumSize(QSize(40, 40))
+        icon3 = QIcon()
+        iconThemeName = u"SP_TitleBarMaxButton"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon3 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon3.addFile(u".", QSize(), QIcon.Normal, QIcon.Off)
+
+        self.maximize.setIcon(icon3)
+
+        self.bottom_layout_box.addWidget(self.maximize)
+
+        self.pb_rate_label = QLabel(self.bottom_control_box)
+        self.pb_rate_label.setObjectName(u"pb_rate_label")
+
+        self.bottom_layout_box.addWidget(self.pb_rate_label)
+
+        self.offset_label = QLabel(self.bottom_control_box)
+        self.offset_label.setObjectName(u"offset_label")
+
+        self.bottom_layout_box.addWidget(self.offset_label)
+
+        self.horizontalSpacer = QSpacerItem(40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum)
+
+        self.bottom_layout_box.addItem(self.horizontalSpacer)
+
+        self.volume_label = QLabel(self.bottom_control_box)
+        self.volume_label.setObjectName(u"volume_label")
+
+        self.bottom_layout_box.addWidget(self.volume_label)
+
+        self.volume_slider = QSlider(self.bottom_control_box)
+        self.volume_slider.setObjectName(u"volume_slider")
+        self.volume_slider.setMaximum(100)
+        self.volume_slider.setOrientation(Qt.Horizontal)
+
+        self.bottom_layout_box.addWidget(self.volume_slider)
+
+        self.decr_pb_rate = QPushButton(self.bottom_control_box)
+        self.decr_pb_rate.setObjectName(u"decr_pb_rate")
+        sizePolicy2.setHeightForWidth(self.decr_pb_rate.sizePolicy().hasHeightForWidth())
+        self.decr_pb_rate.setSizePolicy(sizePolicy2)
+        self.decr_pb_rate.setMaximumSize(QSize(40, 40))
+        icon4 = QIcon()
+        iconThemeName = u"SP_MediaSeekBackward"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon4 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon4.addFile(u".", QSize(), QIcon.Normal, QIcon.Off)
+
+        self.decr_pb_rate.setIcon(icon4)
+
+        self.bottom_layout_box.addWidget(self.decr_pb_rate)
+
+        self.stopbutton = QPushButton(self.bottom_control_box)
+        self.stopbutton.setObjectName(u"stopbutton")
+        sizePolicy2.setHeightForWidth(self.stopbutton.sizePolicy().hasHeightForWidth())
+        self.stopbutton.setSizePolicy(sizePolicy2)
+        self.stopbutton.setMaximumSize(QSize(40, 40))
+        icon5 = QIcon()
+        iconThemeName = u"SP_MediaStop"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon5 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon5.addFile(u".", QSize(), QIcon.Normal, QIcon.Off)
+
+        self.stopbutton.setIcon(icon5)
+
+        self.bottom_layout_box.addWidget(self.stopbutton)
+
+        self.incr_pb_rate = QPushButton(self.bottom_control_box)
+        self.incr_pb_rate.setObjectName(u"incr_pb_rate")
+        sizePolicy2.setHeightForWidth(self.incr_pb_rate.sizePolicy().hasHeightForWidth())
+        self.incr_pb_rate.setSizePolicy(sizePolicy2)
+        self.incr_pb_rate.setMaximumSize(QSize(40, 40))
+        icon6 = QIcon()
+        iconThemeName = u"SP_MediaSeekForward"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon6 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon6.addFile(u".", QSize(), QIcon.Normal, QIcon.Off)
+
+        self.incr_pb_rate.setIcon(icon6)
+
+        self.bottom_layout_box.addWidget(self.incr_pb_rate)
+
+        self.bottom_layout_box.setStretch(0, 0)
+        self.bottom_layout_box.setStretch(1, 0)
+        self.bottom_layout_box.setStretch(2, 0)
+        self.bottom_layout_box.setStretch(3, 0)
+        self.bottom_layout_box.setStretch(4, 0)
+        self.bottom_layout_box.setStretch(5, 0)
+        self.bottom_layout_box.setStretch(6, 0)
+        self.bottom_layout_box.setStretch(7, 0)
+        self.bottom_layout_box.setStretch(8, 0)
+        self.bottom_layout_box.setStretch(9, 0)
+        self.bottom_layout_box.setStretch(10, 0)
+        self.bottom_layout_box.setStretch(11, 0)
+
+        self.vboxlayout.addWidget(self.bottom_control_box)
+
+        self.mqtt_control_box = QWidget(self.verticalLayoutWidget)
+        self.mqtt_control_box.setObjectName(u"mqtt_control_box")
+        self.mqtt_layout = QHBoxLayout(self.mqtt_control_box)
+        self.mqtt_layout.setObjectName(u"mqtt_layout")
+        self.ip_label = QLabel(self.mqtt_control_box)
+        self.ip_label.setObjectName(u"ip_label")
+        self.ip_label.setMaximumSize(QSize(16777215, 35))
+
+        self.mqtt_layout.addWidget(self.ip_label)
+
+        self.ip_address = QLineEdit(self.mqtt_control_box)
+        self.ip_address.setObjectName(u"ip_address")
+        self.ip_address.setMaximumSize(QSize(16777215, 35))
+        self.ip_address.setClearButtonEnabled(False)
+
+        self.mqtt_layout.addWidget(self.ip_address)
+
+        self.id_label = QLabel(self.mqtt_control_box)
+        self.id_label.setObjectName(u"id_label")
+        self.id_label.setMaximumSize(QSize(16777215, 35))
+
+        self.mqtt_layout.addWidget(self.id_label)
+
+        self.client_id_input = QLineEdit(self.mqtt_control_box)
+        self.client_id_input.setObjectName(u"client_id_input")
+        self.client_id_input.setMaximumSize(QSize(16777215, 35))
+        self.client_id_input.setEchoMode(QLineEdit.Password)
+
+        self.mqtt_layout.addWidget(self.client_id_input)
+
+        self.topic_label = QLabel(self.mqtt_control_box)
+        self.topic_label.setObjectName(u"topic_label")
+        self.topic_label.setMaximumSize(QSize(16777215, 35))
+
+        self.mqtt_layout.addWidget(self.topic_label)
+
+        self.topic_input = QLineEdit(self.mqtt_control_box)
+        self.topic_input.setObjectName(u"topic_input")
+        self.topic_input.setMaximumSize(QSize(16777215, 35))
+
+        self.mqtt_layout.addWidget(self.topic_input)
+
+        self.server_input = QCheckBox(self.mqtt_control_box)
+        self.server_input.setObjectName(u"server_input")
+        self.server_input.setMaximumSize(QSize(16777215, 35))
+
+        self.mqtt_layout.addWidget(self.server_input)
+
+        self.embedded_broker_input = QCheckBox(self.mqtt_control_box)
+        self.embedded_broker_input.setObjectName(u"embedded_broker_input")
+        self.embedded_broker_input.setEnabled(False)
+        self.embedded_broker_input.setMaximumSize(QSize(16777215, 35))
+
+        self.mqtt_layout.addWidget(self.embedded_broker_input)
+
+        self.horizontalSpacer_2 = QSpacerItem(40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum)
+
+        self.mqtt_layout.addItem(self.horizontalSpacer_2)
+
+        self.connect_button = QPushButton(self.mqtt_control_box)
+        self.connect_button.setObjectName(u"connect_button")
+        self.connect_button.setMaximumSize(QSize(16777215, 35))
+
+        self.mqtt_layout.addWidget(self.connect_button)
+
+
+        self.vboxlayout.addWidget(self.mqtt_control_box)
+
+        self.vboxlayout.setStretch(0, 1)
+        self.vboxlayout.setStretch(1, 0)
+        self.vboxlayout.setStretch(2, 0)
+        self.vboxlayout.setStretch(3, 0)
+        MainWindow.setCentralWidget(self.centralwidget)
+        self.menu_bar = QMenuBar(MainWindow)
+        self.menu_bar.setObjectName(u"menu_bar")
+        self.menu_bar.setGeometry(QRect(0, 0, 642, 23))
+        MainWindow.setMenuBar(self.menu_bar)
+
+        self.retranslateUi(MainWindow)
+
+        QMetaObject.connectSlotsByName(MainWindow)
+    # setupUi
+
+    def retranslateUi(self, MainWindow):
+        MainWindow.setWindowTitle(QCoreApplication.translate("MainWindow", u"MQTT Sync Player", None))
+        self.timelabel.setText(QCoreApplication.translate("MainWindow", u"00:00:00", None))
+        self.previousframe.setText("")
+        self.playbutton.setText("")
+        self.nextframe.setText("")
+        self.maximize.setText("")
+        self.pb_rate_label.setText(QCoreApplication.translate("MainWindow", u"Playback rate: 1x", None))
+        self.offset_label.setText(QCoreApplication.translate("MainWindow", u"Offset: 0ms", None))
+        self.volume_label.setText(QCoreApplication.translate("MainWindow", u"Volume", None))
+        self.decr_pb_rate.setText("")
+        self.stopbutton.setText("")
+        self.incr_pb_rate.setText("")
+        self.ip_label.setText(QCoreApplication.translate("MainWindow", u"IP:", None))
+        self.id_label.setText(QCoreApplication.translate("MainWindow", u"ID:", None))
+        self.client_id_input.setText("")
+        self.topic_label.setText(QCoreApplication.translate("MainWindow", u"Topic:", None))
+        self.server_input.setText(QCoreApplication.translate("MainWindow", u"Server", None))
+#if QT_CONFIG(tooltip)
+        self.embedded_broker_input.setToolTip(QCoreApplication.translate("MainWindow", u"Run the MQTT broker inside this player, followers connect to this machine", None))
+#endif // QT_CONFIG(tooltip)
+        self.embedded_broker_input.setText(QCoreApplication.translate("MainWindow", u"Host broker", None))
+        self.connect_button.setText(QCoreApplication.translate("MainWindow", u"Connect", None))
+    # retranslateUi
+